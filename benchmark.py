@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import io, os, sys, json, time, random, argparse, platform, statistics, subprocess, tempfile, contextlib
+import openpyxl, pdfplumber
+from datetime import datetime, timedelta
+from pathlib import Path
+from openpyxl import Workbook, load_workbook
+import importfsm
+
+# SYNTHETIC REVERSE TRACE ###################################################################
+rt_headers = ["Trace Type", "Trace Level", "Standard", "OOT UID", "Standard Product", "Owning Lab", "Prev Cal Date", "Curr Cal Date", "OOT Date",
+    "DUT ID", "Product", "DUT Cal Date", "Temp", "Humidity", "Service Level", "Cal Result", "Cert #", "Cert url", "DS Link"] # Same layout as FSM's export: A-I the standard, J-S the DUTs (see importfsm.rt_col_map)
+service_levels = ["Z540.1 w/data", "ISO 17025 w/data", "Standard w/o data"]                 # A spread of Col O values, so the Z540 formulas get exercised
+cal_results = ["0 - Passed ", "1 - Failed ", "2 - Limited In Use ", "3 - Adjusted "]        # Trailing spaces and all, like FSM sends them
+
+def make_reverse_trace(path, assets, products, uid="B000000", seed=1):                      # A "Reverse Trace - UID" workbook with this many assets spread over this many products
+    rnd = random.Random(seed)                                                               # Seeded, so every run benchmarks the same trace
+    prev_cal = datetime(2024, 1, 5)                                                         # The standard's last two cal dates
+    curr_cal = datetime(2025, 1, 5)
+    wb = Workbook(write_only=True)                                                          # Write-only, so 50k rows doesn't take longer than the benchmark itself
+    ws = wb.create_sheet("Reverse Trace - UID")
+    ws.append(rt_headers)
+    for i in range(assets):                                                                 # One row per asset that used the standard
+        ws.append(["Reverse", 1, "Errant Standard", uid, "TEK STD-1", "Baltimore", prev_cal, curr_cal, curr_cal,
+            f"U{100000 + i}",                                                               # DUT ID
+            f"TEK MODEL-{rnd.randrange(products):05d}",                                     # Product; cardinality is what drives the sample
+            prev_cal + timedelta(days=rnd.randrange(365)),                                  # DUT Cal Date, somewhere in the window
+            23, 45, rnd.choice(service_levels), rnd.choice(cal_results),
+            f"C{i:07d}", f"https://certs.example/{i}", f"datasheets.example/{i}"])
+    wb.save(path)
+
+# SYNTHETIC DATASHEET PDF ################################################################### NOTE Hand-rolled PDF, so there's no extra dependency: grey parameter bars, the Function/Decision Rule markers, and some failures
+ds_column_x = [30, 190, 260, 330, 390, 450, 510, 582]                                       # Column edges across a letter-size page
+ds_rows_per_page = 30
+
+def pdf_text(text):                                                                         # Escape a string for a PDF text object
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_datasheet_rows(params, points, fails, seed=2):                                     # The datasheet as rows: (kind, cells), kind being "header", "bar" or "point"
+    rnd = random.Random(seed)
+    failed = set(rnd.sample(range(params * points), min(fails, params * points)))           # Which test points fail
+    rows = [("header", ["Function", "Nominal", "Measured", "Pass/Fail", "Lower Limit", "Upper Limit", "Units"])]
+    point = 0
+    for p in range(params):                                                                 # Each parameter: a grey bar, then its test points
+        rows.append(("bar", [f"Parameter {p} DC Voltage Accuracy"] + [None] * 6))
+        for t in range(points):
+            nominal = float(t + 1)
+            lower, upper = nominal - 0.1, nominal + 0.1
+            measured = upper + 0.05 * (1 + t) if point in failed else nominal + 0.01        # Fails land outside the upper limit, by varying amounts
+            rows.append(("point", [f"Test {p}.{t}", f"{nominal:.3f}", f"{measured:.4f}", "Fail" if point in failed else "Pass",
+                f"{lower:.3f}", f"{upper:.3f}", "V"]))
+            point += 1
+    return rows
+
+def page_ops(rows):                                                                         # Content stream for one page of the table
+    ops, y, height = [], 740, 18
+    for kind, cells in rows:
+        if kind == "bar":                                                                   # The grey bar, full table width, under the parameter name
+            ops.append(f"0.75 0.75 0.75 rg {ds_column_x[0]} {y - height} {ds_column_x[-1] - ds_column_x[0]} {height} re f 0 0 0 rg")
+        for c in range(7):                                                                  # Ruled cells, so pdfplumber's table finder sees a table
+            ops.append(f"{ds_column_x[c]} {y - height} {ds_column_x[c + 1] - ds_column_x[c]} {height} re S")
+            if cells[c] is not None:
+                ops.append(f"BT /F1 7 Tf {ds_column_x[c] + 2} {y - height + 5} Td ({pdf_text(str(cells[c]))}) Tj ET")
+        y -= height
+    return ops
+
+def make_datasheet(path, params, points, fails, cover_pages=2, tail_pages=1, seed=2):       # A Tek-style datasheet PDF: cover pages, the results table (grey parameter bars and all), "Decision Rule", trailing pages
+    rows = make_datasheet_rows(params, points, fails, seed)
+    pages = [[f"BT /F1 12 Tf 50 700 Td (Certificate of Calibration, page {n + 1}) Tj ET"] for n in range(cover_pages)]
+    pages += [page_ops(rows[i:i + ds_rows_per_page]) for i in range(0, len(rows), ds_rows_per_page)]
+    pages.append(page_ops([("point", ["Decision Rule", "Simple acceptance", None, None, None, None, None])]))
+    pages += [[f"BT /F1 12 Tf 50 700 Td (Measurement uncertainty statement {n + 1}) Tj ET"] for n in range(tail_pages)]
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]                   # Object 1: the font
+    pages_id = 2 + 2 * len(pages)                                                           # Object numbers: font, then (content, page) per page, then the page tree, then the catalog
+    kids = []
+    for ops in pages:
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>" % (pages_id, len(objects)))
+        kids.append(b"%d 0 R" % len(objects))
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objects, start=1):                                              # Body
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, obj)
+    xref = len(out)                                                                         # Cross-reference table, so readers can find everything
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    Path(path).write_bytes(bytes(out))
+
+# BENCHMARK RUN #############################################################################
+def run_case(work_dir, assets, products, params, points, fails, ds_workers=1, compact=False, overlap=True, stream=False): # Build one synthetic asset folder and time import_oot() on it, stage by stage
+    uid = f"B{assets:06d}"
+    this_oot_dir = work_dir / f"{uid}-{products}-{params}-{fails}"                          # One folder per case, so nothing bleeds between them
+    this_oot_dir.mkdir(parents=True, exist_ok=True)
+    make_reverse_trace(this_oot_dir / importfsm.rev_trace, assets, products, uid)
+    make_datasheet(this_oot_dir / importfsm.ds_filename, params, points, fails)
+    importfsm.ds_cache_dir = this_oot_dir / ".datasheet_cache"                              # A fresh datasheet cache every case, so the PDF phase is actually parsed
+    importfsm.index_db = this_oot_dir / "oot_index.sqlite"                                  # and a throwaway asset index, so synthetic OOTs never land in the real one
+    importfsm.stage_timer = timer = importfsm.StageTimer()                                  # Start the clock
+    with contextlib.redirect_stdout(sys.stderr):                                            # import_oot() chats; keep stdout clean for the JSON
+        final_xlsx = importfsm.import_oot(this_oot_dir, uid, True, ds_workers, compact, False, overlap, stream)
+    importfsm.stage_timer = None
+    return {"assets": assets, "products": products, "params": params, "points": points, "fails": fails,
+        "ds_workers": ds_workers, "compact": compact, "overlap": overlap and importfsm.spare_cores(1), "stream": stream,
+        "stages": {name: {key: round(value, 4) if isinstance(value, float) else value for key, value in record.items()} for name, record in timer.stages.items()},
+        "total": round(sum(record["wall"] for record in timer.stages.values()), 4),
+        "output_kb": round(final_xlsx.stat().st_size / 1024, 1)}
+
+# INCREMENTAL CHECK ######################################################################### NOTE Not a timing: --incremental has to keep the techs' entries through a patch AND a later full rebuild, which is exactly where they used to get lost
+check_entries = {"R": "Pass", "AJ": "Checked by hand"}                                      # What the "tech" types against each asset (cal result and notes)
+check_test_point = "10 V DC"                                                                # and into M10, the sheet's test point
+
+def missing_entries(final_xlsx, duts):                                                      # Every hand entry that isn't where it should be (on its asset's row, wherever that is now), as "sheet!cell" strings
+    manifest = json.loads(importfsm.manifest_file(final_xlsx).read_text(encoding="utf-8"))
+    wb = load_workbook(final_xlsx, read_only=True)
+    missing = []
+    for title in [title for _, title in manifest["parameters"]] or ["Impact Analysis"]:     # Whichever sheets the analysis is on by now
+        ws = wb[title]
+        if ws["M10"].value != check_test_point:
+            missing.append(f"{title}!M10")
+        rows = {cells[0].value: (row, cells) for row, cells in enumerate(ws.iter_rows(min_row=importfsm.start_row, max_col=36), start=importfsm.start_row)} # {DUT ID: its row}
+        for dut_id in duts:
+            if dut_id not in rows:
+                missing.append(f"{title}!{dut_id}")                                         # (the whole asset)
+                continue
+            row, cells = rows[dut_id]
+            missing += [f"{title}!{col}{row}" for col, value in check_entries.items() if cells[openpyxl.utils.column_index_from_string(col) - 1].value != value]
+    wb.close()
+    return missing
+
+def check_incremental(work_dir):                                                            # Import, hand entries, --incremental after a trace change (patched), --incremental after a datasheet change (rebuilt): {step: how it ran, and what got lost}
+    uid = "B000001"
+    this_oot_dir = work_dir / uid
+    this_oot_dir.mkdir(parents=True, exist_ok=True)
+    rt_file, ds_file = this_oot_dir / importfsm.rev_trace, this_oot_dir / importfsm.ds_filename
+    make_reverse_trace(rt_file, 200, 20, uid)
+    make_datasheet(ds_file, 6, 8, 0)                                                        # Nothing failing yet: the plain Impact Analysis
+    importfsm.ds_cache_dir = this_oot_dir / ".datasheet_cache"                              # Same throwaway cache and index as run_case()
+    importfsm.index_db = this_oot_dir / "oot_index.sqlite"
+    steps = [("import", None),
+        ("patch", lambda: make_reverse_trace(rt_file, 210, 20, uid)),                       # Ten more assets, after the first 200 (same seed): patchable
+        ("rebuild", lambda: make_datasheet(ds_file, 6, 8, 3))]                              # Failures arrive, so parameter sheets: a different workbook, rebuilt from the template
+    report = {}
+    for step, change in steps:
+        if change is not None:
+            change()
+        chat = io.StringIO()
+        with contextlib.redirect_stdout(chat):
+            final_xlsx = importfsm.import_oot(this_oot_dir, uid, True, incremental=True)
+        sys.stderr.write(chat.getvalue())
+        if step == "import":                                                                # The tech's turn
+            wb = load_workbook(final_xlsx)
+            ws = wb["Impact Analysis"]
+            ws["M10"] = check_test_point
+            duts = [ws[f"A{row}"].value for row in range(importfsm.start_row, importfsm.start_row + 5)] # The first five assets
+            for row in range(importfsm.start_row, importfsm.start_row + 5):
+                for col, value in check_entries.items():
+                    ws[f"{col}{row}"] = value
+            wb.save(final_xlsx)
+            continue
+        report[step] = {"patched": "(patched" in chat.getvalue(), "missing": missing_entries(final_xlsx, duts)}
+    return report
+
+# STARTUP ################################################################################### NOTE What the techs (and the GUI) feel before any work happens: how long until the first prompt, and what got imported to get there
+heavy_modules = ["openpyxl", "pdfplumber", "pdfminer", "PIL"]                               # None of these should load before there's an import to run
+
+def time_import():                                                                          # Fresh interpreter: seconds to import importfsm, and which heavy modules came along
+    probe = ("import sys, time; start = time.perf_counter(); import importfsm; elapsed = time.perf_counter() - start; "
+        f"print(elapsed, *[name for name in {heavy_modules!r} if name in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", probe], cwd=Path(importfsm.__file__).parent, capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]), out[1:]
+
+def time_to_prompt(prompt=b"Enter lab location: "):                                         # Fresh interpreter: seconds from launching importfsm.py (in a folder with no trace, like a tech's home dir) to its first prompt
+    with tempfile.TemporaryDirectory(prefix="oot-startup-") as cwd:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(Path(importfsm.__file__))], cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        seen = b""
+        while prompt not in seen:                                                           # input() writes the prompt without a newline, so read whatever's there
+            chunk = os.read(proc.stdout.fileno(), 256)
+            if not chunk:                                                                   # Exited before prompting
+                break
+            seen += chunk
+        elapsed = time.perf_counter() - start
+        proc.kill()
+        proc.wait()
+    if prompt not in seen:
+        raise RuntimeError(f"importfsm.py never prompted: {seen.decode(errors='replace')!r}")
+    return elapsed
+
+def run_startup(repeat):                                                                    # Medians over repeat fresh interpreters, the first one (cold disk cache) included
+    imports = [time_import() for _ in range(repeat)]
+    prompts = [time_to_prompt() for _ in range(repeat)]
+    return {"repeat": repeat, "import_s": round(statistics.median(t for t, _ in imports), 4),
+        "first_prompt_s": round(statistics.median(prompts), 4), "heavy_modules_at_import": sorted(set().union(*(set(m) for _, m in imports)))}
+
+def main():                                                                                 # Every combination of the sizes given, repeated, as one JSON report
+    parser = argparse.ArgumentParser(description="Time importfsm's pipeline stages on synthetic Reverse Traces and datasheets, against the real template.")
+    parser.add_argument("--assets", type=int, nargs="+", default=[100, 1000, 10000], help="Reverse Trace sizes to run (default: 100 1000 10000)")
+    parser.add_argument("--products", type=int, nargs="+", default=[20], help="Distinct products per trace (default: 20)")
+    parser.add_argument("--params", type=int, default=6, help="Parameters (grey bars) in the datasheet (default: 6)")
+    parser.add_argument("--points", type=int, default=8, help="Test points per parameter (default: 8)")
+    parser.add_argument("--fails", type=int, nargs="+", default=[3], help="Failed test points in the datasheet (default: 3)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (default: 1)")
+    parser.add_argument("--ds-workers", type=int, default=1, help="Processes for datasheet extraction (default: 1)")
+    parser.add_argument("--compact", action="store_true", help="Benchmark the --compact output")
+    parser.add_argument("--sequential", action="store_true", help="Benchmark with the inputs loaded one after another (import_oot(overlap=False))")
+    parser.add_argument("--stream", action="store_true", help="Benchmark the constant-memory --stream output")
+    parser.add_argument("--check-incremental", action="store_true", help="Instead of timing: check that --incremental keeps hand entries through a patch and then a full rebuild (exits 1 if any go missing)")
+    parser.add_argument("--startup", action="store_true", help="Only measure startup: import time and time to the first prompt, in fresh interpreters")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the report here")
+    args = parser.parse_args()
+    if args.startup:                                                                        # No pipeline runs, so no template needed
+        report = {"when": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "platform": platform.platform(),
+            "startup": run_startup(max(args.repeat, 5))}
+        text = json.dumps(report, indent=2)
+        if args.json:
+            args.json.write_text(text + "\n", encoding="utf-8")
+        print(text)
+        return
+    if not importfsm.oot_template.exists():                                                 # Real template or nothing; a fake one wouldn't tell us anything
+        print(f"{importfsm.oot_template.name} does not exist.", file=sys.stderr)
+        raise SystemExit(1)
+    if args.check_incremental:
+        with tempfile.TemporaryDirectory(prefix="oot-check-") as tmp:
+            report = check_incremental(Path(tmp))
+        print(json.dumps(report, indent=2))
+        ok = report["patch"]["patched"] and not report["rebuild"]["patched"] and not any(step["missing"] for step in report.values()) # (and each step has to have gone the way it was meant to, or it checked nothing)
+        raise SystemExit(0 if ok else 1)
+    importfsm.template_snapshot(importfsm.oot_template)                                     # Warm the template cache, so "template" is the steady-state cost
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="oot-bench-") as tmp:                           # Everything synthetic lives and dies in here
+        for assets in args.assets:
+            for products in args.products:
+                for fails in args.fails:
+                    for _ in range(args.repeat):
+                        result = run_case(Path(tmp), assets, products, args.params, args.points, fails, args.ds_workers, args.compact, not args.sequential, args.stream)
+                        print(f"{assets} assets, {products} products, {fails} fails: {result['total']:.2f}s", file=sys.stderr)
+                        runs.append(result)
+    report = {"when": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "openpyxl": openpyxl.__version__, "pdfplumber": pdfplumber.__version__, "template": importfsm.oot_template.name, "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.json:                                                                           # Keep one around for comparing against later
+        args.json.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+# MAIN LOOP INITIATION ######################################################################
+if __name__ == "__main__":
+    main()
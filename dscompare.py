@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import sys, glob, json, time, argparse, platform
+from datetime import datetime
+from pathlib import Path
+import importfsm
+
+# COMPARISON ################################################################################ NOTE Every backend parses the same PDFs uncached, and gets diffed against the reference ("table") on exactly what import_oot() uses
+compared = ["rows", "parameters", "failures", "worst"]                                      # The parts of a parsed datasheet that have to match
+
+def find_pdfs(targets):                                                                     # PDFs, folders (every DS.pdf under them) and globs, de-duplicated, in the order given
+    pdfs = []
+    for target in targets:
+        for match in sorted(glob.glob(target)) if glob.has_magic(target) else [target]:     # Same glob handling as batch mode
+            path = Path(match).resolve()
+            for pdf in sorted(path.rglob(importfsm.ds_filename)) if path.is_dir() else [path]:
+                if pdf not in pdfs:
+                    pdfs.append(pdf)
+    return pdfs
+
+def first_difference(reference, candidate):                                                 # Where two parses part ways: (part, detail), or None if they match
+    if (reference is None) != (candidate is None):
+        return "datasheet", f"reference {'found no table' if reference is None else 'parsed'}, candidate {'found no table' if candidate is None else 'parsed'}"
+    if reference is None:
+        return None
+    for part in compared:
+        expected, got = reference[part], candidate[part]
+        if expected == got:
+            continue
+        if part == "rows":                                                                  # The table itself: name the first row that differs
+            for i, (row_a, row_b) in enumerate(zip(expected, got), start=1):
+                if row_a != row_b:
+                    return part, f"row {i}: {row_a!r} != {row_b!r}"
+            return part, f"{len(expected)} rows != {len(got)} rows"
+        return part, f"{expected!r} != {got!r}"
+    return None
+
+def compare_pdf(pdf, backends):                                                             # Parse one PDF with every backend: {backend: seconds}, {backend: first difference from the reference}
+    seconds, parsed = {}, {}
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            parsed[backend] = importfsm.parse_datasheet(pdf, 1, backend)                    # Straight past the cache, one process, so the times compare
+        except Exception as err:                                                            # A backend blowing up on a PDF is a mismatch, not the end of the run
+            parsed[backend] = err
+        seconds[backend] = round(time.perf_counter() - start, 4)
+    reference = parsed[backends[0]]
+    differences = {}
+    for backend in backends[1:]:
+        if isinstance(parsed[backend], Exception) or isinstance(reference, Exception):
+            failed = parsed[backend] if isinstance(parsed[backend], Exception) else reference
+            differences[backend] = ("error", f"{type(failed).__name__}: {failed}")
+        else:
+            differences[backend] = first_difference(reference, parsed[backend])
+    return seconds, differences
+
+def main():                                                                                 # Diff every datasheet backend against the reference over a corpus of PDFs, as one JSON report
+    parser = argparse.ArgumentParser(description="Check importfsm's datasheet backends against the reference table finder on real datasheets, before switching --ds-extractor.")
+    parser.add_argument("targets", nargs="*", default=[str(importfsm.oots_dir / "*" / "*" / "*" / importfsm.ds_filename)],
+        help="Datasheet PDFs, or folders/globs to find DS.pdf in (default: every asset folder under the OOTs folder)")
+    parser.add_argument("--backend", choices=[name for name in importfsm.ds_extractors if name != "table"], action="append", default=None,
+        help="Backend to check (repeatable; default: all of them)")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the report here")
+    args = parser.parse_args()
+    backends = ["table"] + (args.backend or [name for name in importfsm.ds_extractors if name != "table"])
+    pdfs = find_pdfs(args.targets)
+    if not pdfs:
+        print("No datasheets found.", file=sys.stderr)
+        raise SystemExit(1)
+    results = []
+    for pdf in pdfs:
+        seconds, differences = compare_pdf(pdf, backends)
+        results.append({"pdf": str(pdf), "seconds": seconds,
+            "matches": {backend: difference is None for backend, difference in differences.items()},
+            "differences": {backend: list(difference) for backend, difference in differences.items() if difference is not None}})
+        print(f"{pdf}: " + ", ".join(f"{backend} {'OK' if difference is None else 'DIFFERS (' + difference[0] + ')'}" for backend, difference in differences.items()), file=sys.stderr)
+    summary = {backend: {"matched": sum(result["matches"][backend] for result in results), "of": len(results),
+        "seconds": round(sum(result["seconds"][backend] for result in results), 4)} for backend in backends[1:]}
+    report = {"when": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "platform": platform.platform(),
+        "reference_seconds": round(sum(result["seconds"]["table"] for result in results), 4), "summary": summary, "pdfs": results}
+    text = json.dumps(report, indent=2, default=str)
+    if args.json:                                                                           # Keep one around for the next parser change
+        args.json.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    raise SystemExit(0 if all(all(result["matches"].values()) for result in results) else 1) # Non-zero if any backend disagreed anywhere, so it can gate a switch
+
+# MAIN LOOP INITIATION ######################################################################
+if __name__ == "__main__":
+    main()
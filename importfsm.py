@@ -1,250 +1,1486 @@
 #!usr/bin/env python
 
-import os, shutil, warnings, pdfplumber, logging
-from openpyxl import load_workbook
+import os, re, gc, sys, glob, json, math, time, zlib, ctypes, select, signal, struct, cProfile, pickle, copyreg, hashlib, tempfile, importlib, warnings, argparse, threading
+from copy import copy
+from io import BytesIO
 from datetime import datetime
-from openpyxl.styles import PatternFill
-from openpyxl.formatting.rule import FormulaRule
-from openpyxl.drawing.image import Image as XLImage
-from openpyxl.worksheet.datavalidation import DataValidation
 from pathlib import Path
+from itertools import chain
+from array import array
+from bisect import bisect_right
+try:                                                                                        # Peak RSS for --profile; Unix only, so Windows just goes without
+    import resource
+    HAVE_RESOURCE = True
+except ImportError:
+    HAVE_RESOURCE = False
 # QUIET, QUIET ##############################################################################
 warnings.simplefilter("ignore", UserWarning)                                                # Ignore specific openpyxl warnings
-logging.getLogger("pdfminer").setLevel(logging.ERROR)                                       # Prevents "CropBox missing from /Page, defaulting to MediaBox" spam
-blue_fill = PatternFill(start_color="00b0f0", end_color="00b0f0", fill_type="solid")        # This for conditional formatting via openpyxl - cell needs input
-green_fill = PatternFill(start_color="00b050", end_color="00b050", fill_type="solid")       # This for conditional formatting via openpyxl - DUT is good to go
-yellow_fill = PatternFill(start_color="ffff00", end_color="ffff00", fill_type="solid")      # This for conditional formatting via openpyxl - DUT needs something/FI
-red_fill = PatternFill(start_color="ff0000", end_color="ff0000", fill_type="solid")         # This for conditional formatting via openpyxl - DUT should be recalled
+blue_fill = "00b0f0"                                                                        # This for conditional formatting via openpyxl - cell needs input
+green_fill = "00b050"                                                                       # This for conditional formatting via openpyxl - DUT is good to go
+yellow_fill = "ffff00"                                                                      # This for conditional formatting via openpyxl - DUT needs something/FI
+red_fill = "ff0000"                                                                         # This for conditional formatting via openpyxl - DUT should be recalled
+# LAZY IMPORTS ############################################################################## NOTE openpyxl and pdfplumber are imported inside the functions that use them, so the prompts (and the GUI) come up without waiting on them
+def open_pdf(ds_file):                                                                      # pdfplumber.open(), importing pdfplumber (and pdfminer with it) the first time a datasheet actually gets parsed
+    import logging, pdfplumber
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)                                   # Prevents "CropBox missing from /Page, defaulting to MediaBox" spam
+    return pdfplumber.open(ds_file)
+
+def solid_fill(color):                                                                      # The PatternFill for one of the colors above, built when a rule needs it
+    from openpyxl.styles import PatternFill
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+# PATHS & CONSTANTS #########################################################################
+code_dir = Path(__file__).parent                                                            # /home/datavikingr/Tek/OOTs/auto-oot
+oots_dir = code_dir.parent                                                                  # /home/datavikingr/Tek/OOTs
+ds_filename = "DS.pdf"                                                                      # This is the datasheet we'll import.
+rev_trace = "Reverse Trace.xlsx"                                                            # This is the source rev trace data
+tek_logo = code_dir / "Tek_logo.png"                                                        # /home/datavikingr/Tek/OOTs/auto-oot/Tek_logo.png
+oot_template = code_dir / "FSMOOTSIA.xlsm"                                                  # /home/datavikingr/Tek/OOTs/auto-oot/FSMOOTSIA.xlsm - This is the template we're reproducing
+start_row = 10                                                                              # This is the header of the analysis itself, and is row(0), effectively
+template_end_row = 5008                                                                     # This is the last row of the template's analysis table. We no longer stop here - the analysis is resized to fit each trace, bigger or smaller
+template_cache_dir = code_dir / ".template_cache"                                           # Pre-parsed snapshots of the template live here, so we don't re-parse 5k rows of XML every run
+ds_start_keyword = "Function"                                                               # Datasheet test results start at the table header with this in it
+ds_end_keyword = "Decision Rule"                                                            # and end at the footer with this in it
+ds_columns = {"nominal": ("Nominal", 1), "measured": ("Measured", 2), "lower": ("Lower Limit", 4), "upper": ("Upper Limit", 5), "units": ("Units", 6)} # Datasheet columns by header text, with Tek's usual position as the fallback
+ds_number = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")                        # A number somewhere in a datasheet cell
+ds_digit_group = re.compile(r"(?<=\d)[, \u00a0\u2009\u202f](?=\d{3}(?!\d))")                # A thousands separator ("1,000.000 MHz", "10 000", thin or no-break spaces), which would otherwise end the number early
+ds_cache_dir = code_dir / ".datasheet_cache"                                                # Already-parsed datasheets live here, keyed by the PDF's content hash
+ds_cache_max_bytes = 64 * 1024 * 1024                                                       # Least recently used datasheets get evicted past this size; a parsed datasheet is typically tens of KB
+ds_extractor = "table"                                                                      # Datasheet table backend (see ds_extractors): "table" is pdfplumber's table finder, "words" the faster ruled-grid one; dscompare.py checks whether they agree
+ds_parser_version = 4                                                                       # Bump this whenever the datasheet parsing changes, so old cache entries stop being used
 # HELPER FUNCTIONS ##########################################################################
 def blue_if_blank_formatting(sheet, ranges):                                                # Add conditional formatting to highlight blank cells with blue fill for the given list of range strings.
+    from openpyxl.formatting.rule import FormulaRule
     for rng in ranges:                                                                      # Iterate over the ranges provided
         first_cell = rng.split(":")[0]                                                      # Get the first element of the cell
         formula = f'=OR(ISBLANK({first_cell}), {first_cell}="")'                            # Establish the conditional formatting formula
-        rule = FormulaRule(formula=[formula], fill=blue_fill)                               # Establish the rule, for the formula above
+        rule = FormulaRule(formula=[formula], fill=solid_fill(blue_fill))                   # Establish the rule, for the formula above
         sheet.conditional_formatting.add(rng, rule)                                         # add the rule to the sheet provided
 
 def TUR_check_formatting(sheet, start_row, end_row):                                        # More conditional formatting based on Column X - the preliminary evaluation
+    from openpyxl.formatting.rule import FormulaRule
     target_range = f"A{start_row}:X{end_row}"
     col_x_first = f"$X{start_row}"
     sheet.conditional_formatting.add(
         target_range,
-        FormulaRule(formula=[f'={col_x_first}="Not Significant"'], fill=green_fill)
+        FormulaRule(formula=[f'={col_x_first}="Not Significant"'], fill=solid_fill(green_fill))
     )
     sheet.conditional_formatting.add(
         target_range,
-        FormulaRule(formula=[f'={col_x_first}="Semi-Significant"'], fill=yellow_fill)
+        FormulaRule(formula=[f'={col_x_first}="Semi-Significant"'], fill=solid_fill(yellow_fill))
     )
     sheet.conditional_formatting.add(
         target_range,
-        FormulaRule(formula=[f'={col_x_first}="Significant"'], fill=red_fill)
+        FormulaRule(formula=[f'={col_x_first}="Significant"'], fill=solid_fill(red_fill))
     )
 
 def final_eval_formatting(sheet, start_row, end_row):                                       # More conditional formatting based on Column AI - the final evaluation
+    from openpyxl.formatting.rule import FormulaRule
     whole_row = f"A{start_row}:AJ{end_row}"
     col_x_first = f"$AI{start_row}"
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="No Further Action Required"'], fill=green_fill)
+        FormulaRule(formula=[f'={col_x_first}="No Further Action Required"'], fill=solid_fill(green_fill))
     )
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="Analysis performed; no further action required."'], fill=green_fill)
+        FormulaRule(formula=[f'={col_x_first}="Analysis performed; no further action required."'], fill=solid_fill(green_fill))
     )
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="No intersection; no further action required."'], fill=green_fill)
+        FormulaRule(formula=[f'={col_x_first}="No intersection; no further action required."'], fill=solid_fill(green_fill))
     )
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="FI Fails; TSM determination required."'], fill=yellow_fill)
+        FormulaRule(formula=[f'={col_x_first}="FI Fails; TSM determination required."'], fill=solid_fill(yellow_fill))
     )
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="Unit fails analysis; TSM determination required."'], fill=red_fill)
+        FormulaRule(formula=[f'={col_x_first}="Unit fails analysis; TSM determination required."'], fill=solid_fill(red_fill))
     )
     sheet.conditional_formatting.add(
         whole_row,
-        FormulaRule(formula=[f'={col_x_first}="Significant preliminary finding & no data; TSM determination required."'], fill=red_fill)
+        FormulaRule(formula=[f'={col_x_first}="Significant preliminary finding & no data; TSM determination required."'], fill=solid_fill(red_fill))
     )
 
-# MAIN LOOP #################################################################################
-def main():                                                                                 # The main loop of the application
-    # INIT ##################################################################################
-    current_dir = Path.cwd()                                                                # where script was run from
-    this_oot_dir = current_dir                                                              # where script was run from
-    code_dir = Path(__file__).parent                                                        # /home/datavikingr/Tek/OOTs/auto-oot
-    oots_dir = code_dir.parent                                                              # /home/datavikingr/Tek/OOTs
-    ds_filename = "DS.pdf"                                                                  # This is the datasheet we'll import.
-    rev_trace = "Reverse Trace.xlsx"                                                        # This is the source rev trace data
-    tek_logo = code_dir / "Tek_logo.png"                                                    # /home/datavikingr/Tek/OOTs/auto-oot/Tek_logo.png
-    oot_template = code_dir / "FSMOOTSIA.xlsm"                                              # /home/datavikingr/Tek/OOTs/auto-oot/FSMOOTSIA.xlsm - This is the template we're reproducing
-    today = datetime.today().strftime('%m/%d/%Y')                                           # This goes in the header of output file
-    this_year = datetime.today().strftime('%Y')                                             # This is a question for directory-location
-    start_row = 10                                                                          # This is the header of the analysis itself, and is row(0), effectively
-    end_row = 5008                                                                          # This is the current maximum size of these analyses. Adjust THIS number, if we need to analyze assets that have intersected with more than 5k assets
-    # ERROR CHECKING ########################################################################
-    rev_trace_file = this_oot_dir / rev_trace                                               # Establish the file we need
-    if not rev_trace_file.exists():                                                         # This is a good proxy to see what kind of directory we're running the script in - if there isn't a rev trace in cwd, we're probably running it from $HOME, so we need to build the correct location and 'navigate' to it
-        lab = input("Enter lab location: ")                                                 # Baltimore, Strother, etc
-        asset_UID = input("Enter UID: ")                                                    # The asset itself
-        this_oot_dir = oots_dir / f"{this_year}/{lab}/{asset_UID}/"                         # Establish the output directory
-        this_oot_dir.mkdir(parents=True, exist_ok=True)                                     # Ensure output dir exists
-        rev_trace_file = this_oot_dir / rev_trace                                           # And then re-set to where the rev trace must be.
-    else:                                                                                   # Then we have a rev trace file, and we need to set this one variable that's required later
-        asset_UID = this_oot_dir.name                                                       # Because I'm not bloody asking the techs to type UIDs if I can avoid it
-    if not oot_template.exists():                                                           # Let's check for the template file, see if the package was tampered with
-        file = oot_template.name                                                            # Well, it's gone. So, let's get the name out of the file path,
-        print(f"{file} does not exist.")                                                    # so we can announce what's happened
-        raise SystemExit(1)                                                                 # ...and gtfo
-    ds_import = input("Import datasheet? ").strip().lower()                                 # Final bit of INIT input for later. TODO: set this up in the GUI, when that time comes
-    # LOAD WORKBOOK, SHEETS ################################################################# HACK I just learned that opnepyxl plays nice with path objects, so I don't have to refactor most of this as I rebuild around pathlib. Very excited!! - AJH 21AUG25
-    oot_wb = load_workbook(oot_template, data_only=False, keep_vba=False)                   # Load the workbook, so we can get its sheets (read: tabs) 
+# REVERSE TRACE TABLE #######################################################################
+rt_col_map = [
+    ('J', 'A'), ('K', 'B'), ('L', 'C'),
+    ('O', 'D'), ('Q', 'F'), ('R', 'G'),
+    ('S', 'I'), ('M', 'J'), ('N', 'K'),
+    ('P', 'L')]                                                                             # Map the Reverse Trace's columns (source) to the Impact Analysis' columns (destination)
+
+def read_reverse_trace(rev_trace_file):                                                     # Read FSM's Reverse Trace once, into a columnar table: one tuple per column, header row included
+    from openpyxl import load_workbook
+    rt_wb = load_workbook(rev_trace_file, read_only=True)                                   # Read-only mode streams the rows instead of building the whole object model
+    rt_ws = rt_wb["Reverse Trace - UID"]                                                    # The correct sheet, so we can get at the data
+    rows = list(rt_ws.iter_rows(values_only=True))                                          # Every row, as plain tuples of values
+    rt_wb.close()                                                                           # Close it; read-only workbooks hold the file open until we do
+    while rows and all(value is None for value in rows[-1]):                                # FSM exports sometimes trail off into formatted-but-empty rows,
+        rows.pop()                                                                          # which aren't assets
+    width = max((len(row) for row in rows), default=0)                                      # Widest row, so every column is the same length
+    return [tuple(column) for column in zip(*(row + (None,) * (width - len(row)) for row in rows))] # Pivot rows into columns
+
+def rt_column(rt_columns, column):                                                          # One column of the table by letter, header row left off; all None if the trace doesn't reach it (or --stream didn't keep it)
+    from openpyxl.utils import column_index_from_string
+    index = column_index_from_string(column) - 1
+    if index < len(rt_columns) and rt_columns[index] is not None:
+        return rt_columns[index][1:]
+    return (None,) * (len(rt_columns[0]) - 1 if rt_columns else 0)                          # (as long as the rest, so zips don't come up short)
+
+def rt_cell(rt_columns, coordinate):                                                        # rt_ws[coordinate].value, off the table: None past the trace's last row or column, same as openpyxl would give
+    from openpyxl.utils.cell import coordinate_from_string
+    column, row = coordinate_from_string(coordinate)
+    values = rt_column(rt_columns, column)
+    return values[row - 2] if 2 <= row <= len(values) + 1 else None                         # (the header row itself is never asked for)
+
+def write_rows(ws, rows, first_row=1, columns=None):                                        # Bulk write of row tuples, integer-addressed; columns maps tuple positions to sheet columns (default A, B, C...)
+    for r, row in enumerate(rows, start=first_row):                                         # Each row to write
+        for c, value in zip(columns or range(1, len(row) + 1), row):                        # Each value, and the column it goes in
+            if value is not None:                                                           # Blanks stay blank, no point making empty cells
+                ws.cell(row=r, column=c, value=value)                                       # Drop it in
+
+# DATASHEET EXTRACTION ###################################################################### NOTE pdfplumber's table finder is the slowest thing we do, and every page is independent, so it spreads across cores nicely
+def page_mentions(page, *keywords):                                                         # Cheap probe: is any keyword anywhere in this page's text? No table-finding, just the characters
+    text = "".join("".join(char["text"] for char in page.chars).split())                    # Raw characters in content order, whitespace dropped (PDFs don't always bother with space characters)
+    return any("".join(keyword.split()) in text for keyword in keywords)                    # Same treatment for the keywords
+
+def rows_mention(rows, keyword):                                                            # Does any cell of these table rows contain the keyword? Same test filter_ds_table() uses
+    return any(keyword in str(cell) for row in rows or [] if row for cell in row if cell)
+
+def is_grey(color):                                                                         # Parameter bars are filled in some middling grey: gray, RGB with near-equal channels, not almost white or black
+    if not color or not isinstance(color, (list, tuple)) or any(not isinstance(v, (int, float)) for v in color):
+        return False                                                                        # No fill color (or a pattern/named color)
+    if len(color) not in (1, 3):                                                            # Only DeviceGray or DeviceRGB
+        return False
+    return max(color) - min(color) < 0.05 and 0.2 <= color[0] <= 0.9
+
+def grey_bar_rows(page, row_spans):                                                         # Which rows of the page's table ([(top, bottom)] per row) sit on a grey parameter bar? Read off the same page objects, no second look at the PDF
+    bars = [(rect["top"], rect["bottom"]) for rect in page.rects                            # The grey bars: wide, short, filled, grey
+        if rect.get("fill") and rect["width"] >= 0.80 * page.width and 8 <= rect["height"] <= 60 and is_grey(rect.get("non_stroking_color"))]
+    if not bars:                                                                            # Most pages? Nothing to do
+        return []
+    bar_rows = []                                                                           # Indexes into this page's table
+    for i, (top, bottom) in enumerate(row_spans):                                           # Rows come back in the same order as the table's
+        middle = (top + bottom) / 2                                                         # Vertical middle of the row
+        if any(top <= middle <= bottom for top, bottom in bars):                            # On a bar? It's a parameter header
+            bar_rows.append(i)
+    return bar_rows
+
+def table_finder_page(page):                                                                # "table" backend, the reference: pdfplumber's table finder (the same table extract_table() would pick). Returns (table, grey bar rows), table None if there isn't one
+    found = page.find_table()
+    if found is None:
+        return None, []
+    return found.extract(), grey_bar_rows(page, [(row.bbox[1], row.bbox[3]) for row in found.rows])
+
+def snap_coordinates(values, tolerance=3):                                                  # {coordinate: snapped coordinate}, nearly-equal ones (chained within tolerance, like pdfplumber's snap_tolerance) snapped to their mean
+    snapped, cluster = {}, []
+    for value in sorted(set(values)) + [math.inf]:
+        if cluster and value - cluster[-1] > tolerance:
+            mean = sum(cluster) / len(cluster)
+            snapped.update((v, mean) for v in cluster)
+            cluster = []
+        cluster.append(value)
+    return snapped
+
+def ruled_grid(page):                                                                       # The biggest block of ruled rows on the page, straight off its edges: (column xs, [(top, bottom, xs of the cell walls crossing the row)]), or None
+    verticals = [edge for edge in page.edges if edge["orientation"] == "v"]
+    horizontals = [edge for edge in page.edges if edge["orientation"] == "h"]
+    if not verticals or not horizontals:                                                    # No ruling, no table (same as find_table())
+        return None
+    xs = snap_coordinates(edge["x0"] for edge in verticals)
+    walls = [(xs[edge["x0"]], edge["top"], edge["bottom"]) for edge in verticals]
+    snapped_ys = snap_coordinates(edge["top"] for edge in horizontals)
+    rules = {}                                                                              # {y: [(x0, x1)]} of the horizontal rules
+    for edge in horizontals:
+        rules.setdefault(snapped_ys[edge["top"]], []).append((edge["x0"], edge["x1"]))
+    ys = sorted(rules)
+    blocks, block = [], []                                                                  # Runs of ruled rows, each row starting where the last one ended
+    for top, bottom in zip(ys, ys[1:]):                                                     # Every band between two horizontal rules,
+        middle = (top + bottom) / 2
+        cuts = sorted({x for x, wall_top, wall_bottom in walls if wall_top <= middle <= wall_bottom})
+        closed = all(any(x0 <= (left + right) / 2 <= x1 for x0, x1 in rules[y]) for left, right in zip(cuts, cuts[1:]) for y in (top, bottom))
+        if len(cuts) < 2 or not closed:                                                     # that has at least one cell across it, every one ruled top and bottom
+            block = []
+            continue
+        if not block:
+            blocks.append(block)
+        block.append((top, bottom, cuts))
+    blocks = [rows for rows in blocks if sum(len(cuts) - 1 for _, _, cuts in rows) > 1]     # (find_table() doesn't count a lone box as a table either)
+    if not blocks:
+        return None
+    rows = min(blocks, key=lambda rows: (-sum(len(cuts) - 1 for _, _, cuts in rows), rows[0][0])) # Most cells wins, then the topmost, like find_table()
+    return sorted(set(chain.from_iterable(cuts for _, _, cuts in rows))), rows
+
+def word_grid_page(page):                                                                   # "words" backend: the characters dropped straight into the cells of ruled_grid(), skipping pdfplumber's intersection search and cell building. Same (table, grey bar rows) as table_finder_page()
+    from pdfplumber.utils import extract_text
+    grid = ruled_grid(page)
+    if grid is None:
+        return None, []
+    columns, rows = grid
+    tops = [top for top, _, _ in rows]
+    cell_chars = {}                                                                         # {(row, first column of the cell): [chars]}
+    for char in page.chars:                                                                 # A character belongs to the cell its middle is in (as in Table.extract())
+        middle = (char["top"] + char["bottom"]) / 2
+        r = bisect_right(tops, middle) - 1
+        if r < 0 or middle >= rows[r][1]:
+            continue
+        cuts = rows[r][2]
+        k = bisect_right(cuts, (char["x0"] + char["x1"]) / 2) - 1
+        if 0 <= k < len(cuts) - 1:
+            cell_chars.setdefault((r, cuts[k]), []).append(char)
+    table = []
+    for r, (_, _, cuts) in enumerate(rows):
+        walls = set(cuts[:-1])                                                              # A column with no wall on its left here is part of a merged cell (None, like pdfplumber)
+        table.append([(extract_text(cell_chars[r, x]) if (r, x) in cell_chars else "") if x in walls else None for x in columns[:-1]])
+    return table, grey_bar_rows(page, [(top, bottom) for top, bottom, _ in rows])
+
+ds_extractors = {"table": table_finder_page, "words": word_grid_page}                       # Datasheet table backends by name, each page -> (table, grey bar rows)
+
+def use_ds_extractor(extractor):                                                            # Pick the datasheet backend for this process (and, as a pool initializer, for each worker)
+    global ds_extractor
+    ds_extractor = extractor
+
+def iter_page_tables(pdf, page_numbers, started=False, extractor=None):                     # Lazily yield (page number, table, grey bar rows) in page order, opening only the pages that can matter
+    extract_page = ds_extractors[extractor or ds_extractor]
+    for n in page_numbers:                                                                  # One page at a time, only when asked for
+        page = pdf.pages[n]
+        table, bar_rows = None, []
+        if started or page_mentions(page, ds_start_keyword, ds_end_keyword):                # Before the "Function" header, a page that doesn't mention either keyword can't contribute a row, so we skip it (cover pages, certs, etc.)
+            table, bar_rows = extract_page(page)                                            # The table, and while we're on the page, the parameter bars
+            started = started or rows_mention(table, ds_start_keyword)                      # Once the header shows up, every page counts until "Decision Rule"
+        page.close()                                                                        # Drop the page's parsed objects, we're done with it
+        tally(pages=1)                                                                      # (counts for --profile; a no-op in the pool's workers)
+        yield n, table, bar_rows
+        if rows_mention(table, ds_end_keyword):                                             # "Decision Rule" means we're done with the test results,
+            return                                                                          # so don't even open the rest of the pages
+
+def extract_page_tables(ds_file, page_numbers, started=False, extractor=None):              # Worker: the lazy scan over just these pages of the PDF. Returns [(page number, table, grey bar rows)], stopping at "Decision Rule"
+    with open_pdf(ds_file) as pdf:                                                          # Every worker opens its own copy; pdfplumber objects don't cross process boundaries
+        return list(iter_page_tables(pdf, page_numbers, started, extractor))
+
+def iter_ds_tables(ds_file, workers=1, extractor=None):                                     # Yield (table, grey bar rows) for every useful page in page order, lazily; stop opening pages once "Decision Rule" turns up. workers > 1 spreads the pages over a process pool
+    from concurrent.futures.process import ProcessPoolExecutor, BrokenProcessPool
+    extractor = extractor or ds_extractor                                                   # (spelled out for the workers, which may not share our module state)
+    with open_pdf(ds_file) as pdf:                                                          # Serial scan up to (and including) the page with the "Function" header
+        page_count = len(pdf.pages)
+        n = -1                                                                              # Last page we've looked at
+        for n, table, bar_rows in iter_page_tables(pdf, range(page_count), False, extractor): # Lazily, page by page
+            if table:                                                                       # if extract_table() grabbed data,
+                yield table, bar_rows                                                       # hand it on
+            if rows_mention(table, ds_end_keyword):                                         # Already at the end?
+                return                                                                      # Then there's nothing else to open
+            if workers > 1 and rows_mention(table, ds_start_keyword):                       # Found the header: the rest is all test results, worth parallelizing
+                break
+        rest = range(n + 1, page_count)                                                     # Pages after the header page (empty if the serial scan ran the whole PDF)
+        if not rest:
+            return
+        chunk = -(-len(rest) // (workers * 2))                                              # Pages per job, rounded up; two jobs per worker, so one slow chunk doesn't hold everyone up
+        chunks = [rest[i:i + chunk] for i in range(0, len(rest), chunk)]                    # Contiguous page ranges, so each job only opens the PDF once
+        try:                                                                                # If the pool can't start (no fork, locked-down box, etc.)...
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(chunks)))               # Fire up the workers
+            try:
+                futures = [pool.submit(extract_page_tables, ds_file, pages, True, extractor) for pages in chunks] # Already past the header, so nothing gets probed out
+                for future in futures:                                                      # Back in submission order, i.e. page order
+                    for n, table, bar_rows in future.result():
+                        tally(pages=1)                                                      # The workers can't count for us
+                        if table:
+                            yield table, bar_rows
+                        if rows_mention(table, ds_end_keyword):                             # "Decision Rule": done,
+                            return
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)                              # and any chunk we no longer need never starts
+        except (OSError, BrokenProcessPool) as err:                                         # ...we don't give up on the datasheet,
+            print(f"Parallel datasheet extraction failed ({err}), falling back to serial.")
+        for n, table, bar_rows in iter_page_tables(pdf, range(n + 1, page_count), True, extractor): # Serial path for whatever the pool didn't get to
+            if table:
+                yield table, bar_rows
+
+# DATASHEET PARSING #########################################################################
+def filter_ds_table(pages):                                                                 # Keep only the datasheet rows between the "Function" header and the "Decision Rule" footer. Takes (table, grey bar rows) per page, returns (rows, grey bar row numbers)
+    start_keyword = ds_start_keyword                                                        # This is keyword 1, found immediately prior to the relevant data
+    end_keyword = ds_end_keyword                                                            # This is keyword 2, found immediately after the relevant data
+    filtered_table = []                                                                     # yet another clean tablwe object
+    bar_rows = []                                                                           # Row numbers (as on the Datasheet tab) of the grey parameter bars
+    recording = False                                                                       # This is the flag to see if we're pulling that row of data
+    for table, page_bars in pages:                                                          # for each page's table
+        for i, row in enumerate(table):                                                     # for each row of data:
+            if row and any(start_keyword in str(cell) for cell in row if cell):             # see if it's after the start keyword
+                recording = True                                                            # if it is, we're recording it
+            if recording:                                                                   # if we're recording it,
+                filtered_table.append(row)                                                  # we'll add it to our filtered dataset
+                if i in page_bars:                                                          # (and note it if it's a grey bar)
+                    bar_rows.append(len(filtered_table))
+            if row and any(end_keyword in str(cell) for cell in row if cell):               # see if it's after the end keyword
+                break                                                                       # and remove that
+        else:                                                                               # (no end keyword on this page,
+            continue                                                                        # on to the next)
+        break
+    # REMOVE LAST ROW - EXTRANEOUS CATCH ####################################################
+    if filtered_table and any(end_keyword in str(cell) for cell in filtered_table[-1] if cell): # containing "Decision Rule"
+        filtered_table.pop()                                                                # kick that mother- outta there
+        bar_rows = [r for r in bar_rows if r <= len(filtered_table)]
+    return filtered_table, bar_rows
+
+def to_number(cell):                                                                        # Datasheet cells are text ("1.0100", "-3.2 mV", "−0.5"): pull out the number, or NaN if there isn't one
+    match = ds_number.search(ds_digit_group.sub("", str(cell).replace("\u2212", "-"))) if cell else None # (Unicode minus sign shows up in some datasheets)
+    return float(match.group()) if match else math.nan
+
+def analyze_datasheet(ds_rows, bar_rows=None):                                              # One pass over the datasheet rows: parameter model, failures, and the worst failure per parameter
+    titles = [" ".join(str(cell).split()) if cell else "" for cell in (ds_rows[0] if ds_rows else [])] # The "Function" header row tells us where the numbers live
+    columns = {key: titles.index(title) if title in titles else default for key, (title, default) in ds_columns.items()}
+    width = max(4, max(columns.values()) + 1)                                               # Every row gets padded out to at least this many cells
+    header_rows, failures = [], []                                                          # Parameter bars (if the PDF didn't draw any) and failed rows
+    nominal, measured, lower, upper = array("d"), array("d"), array("d"), array("d")        # Numeric columns, one entry per datasheet row
+    for idx, row in enumerate(ds_rows, start=1):                                            # iterate over the rows of the ds, numbered like the Datasheet tab
+        row = list(row) + [None] * (width - len(row))                                       # Pad short rows, so every column lookup below just works
+        if not bar_rows and row[0] and not row[1]:                                          # No grey bars (scanned/flattened PDF)? IF Column A has text AND Column B is empty, it's a parameter
+            header_rows.append((idx, str(row[0])))
+        if row[3] == "Fail":                                                                # IF Column D matches exactly "Fail", not "Fail*"
+            failures.append(idx)                                                            # THEN add it to the list
+        nominal.append(to_number(row[columns["nominal"]]))
+        measured.append(to_number(row[columns["measured"]]))
+        lower.append(to_number(row[columns["lower"]]))
+        upper.append(to_number(row[columns["upper"]]))
+    if bar_rows:                                                                            # The PDF drew grey parameter bars: those rows ARE the parameters
+        header_rows = [(r, " ".join(" ".join(str(cell) for cell in ds_rows[r - 1] if cell).split())) for r in bar_rows] # Name = the text on the bar, tidied up
+    header_rows = [(r, name) for r, name in header_rows if name]                            # A bar with no text on it isn't a parameter
+    parameters = []                                                                         # Parameter model: [name, first row, last row], in datasheet order
+    for i, (row, name) in enumerate(header_rows):                                           # Each parameter runs from its bar...
+        end = header_rows[i + 1][0] - 1 if i + 1 < len(header_rows) else len(ds_rows)       # ...to the row before the next bar (or the end of the datasheet)
+        parameters.append([name, row, end])
+    # WORST ERROR PER PARAMETER ############################################################# NOTE margin < 0 means outside the limits; worst = furthest out, relative to the tolerance band so mixed units compare
+    error = [m - n for m, n in zip(measured, nominal)]                                      # Every row's error, in one sweep
+    margin = [min((d for d in (m - lo, hi - m) if d == d), default=math.nan) for m, lo, hi in zip(measured, lower, upper)] # and its margin to the nearest limit it has (NaN != NaN, so one-sided specs still work)
+    relative = [g / (hi - lo) if hi > lo else g for g, lo, hi in zip(margin, lower, upper)] # and that margin as a fraction of the tolerance band
+    starts = [start for _, start, _ in parameters]                                          # Interval index: parameter first rows, already sorted
+    worst = {}                                                                              # {parameter: worst failure}
+    for fail_row in failures:                                                               # for each failed test point
+        param = parameter_at(parameters, starts, fail_row)                                  # whose is it?
+        if param is None:                                                                   # (a fail above the first parameter bar belongs to nobody)
+            continue
+        i = fail_row - 1
+        entry = worst.setdefault(param, {"fails": 0, "row": fail_row, "point": None, "error": None, "margin": None, "units": None})
+        entry["fails"] += 1
+        if math.isnan(relative[i]) or (entry["margin"] is not None and relative[i] >= entry["relative"]): # Not numbers, or not as bad as what we've got
+            continue
+        row = ds_rows[i]
+        units = row[columns["units"]] if columns["units"] < len(row) else None              # Units, if the datasheet gave any
+        entry.update(row=fail_row, point=row[0], error=None if math.isnan(error[i]) else error[i], margin=margin[i], relative=relative[i], units=units)
+    for entry in worst.values():                                                            # The ranking key was just for us
+        entry.pop("relative", None)
+        if entry["point"] is None:                                                          # No usable numbers anywhere? Still name the first failure
+            entry["point"] = ds_rows[entry["row"] - 1][0]
+    return {"parameters": parameters, "failures": failures, "worst": worst}
+
+def parameter_at(parameters, starts, row):                                                  # Which parameter does this datasheet row belong to? bisect on the sorted first rows, so it's O(log n) per lookup
+    i = bisect_right(starts, row) - 1                                                       # Last parameter starting at or above this row
+    if i >= 0 and row <= parameters[i][2]:                                                  # and the row is inside its range
+        return parameters[i][0]
+    return None
+
+def find_oot_parameters(parameters, failures):                                              # Work out which datasheet parameters (grey bars) have at least one failed test point under them
+    starts = [start for _, start, _ in parameters]                                          # Interval index: parameter first rows, in order
+    oot_parameters = (parameter_at(parameters, starts, fail_row) for fail_row in failures)  # Each failed test point's parameter
+    return list(dict.fromkeys(param for param in oot_parameters if param is not None))      # And then we drop the duplicates, for a single list of parameters that require analysis
+
+def write_worst_error(ws, param, worst):                                                    # Summarize the parameter's failures in the sheet header, J1:L5, styled like the header block next to it
+    entry = worst.get(param) or {}
+    summary = [("Parameter", param, None),
+        ("Failures", entry.get("fails"), None),
+        ("Worst Test Point", entry.get("point"), None),
+        ("Worst Error", entry.get("error"), entry.get("units")),
+        ("Margin", entry.get("margin"), entry.get("units"))]
+    for row, (label, value, units) in enumerate(summary, start=1):
+        ws.cell(row=row, column=10, value=label)._style = copy(ws.cell(row=row, column=5)._style) # Labels look like E1:E5
+        ws.cell(row=row, column=11, value=value)._style = copy(ws["H1"]._style)             # Values look like H1
+        if units or (row, 12) in ws._cells:                                                 # (clearing old units, when a re-import patches the sheet)
+            ws.cell(row=row, column=12).value = units
+
+def write_datasheet_tab(wb, rows):                                                          # The Datasheet tab, up front: the filtered datasheet rows, with failures in red
+    from openpyxl.formatting.rule import FormulaRule
+    ws = wb.create_sheet("Datasheet", index=0)
+    for row in rows:                                                                        # And for each row in the filtered DS data
+        ws.append(row)                                                                      # Dump it into the Datasheet tab in Excel
+    fail_formula = '=$D1="Fail"'                                                            # Establish a conditional formatting rule
+    ws.conditional_formatting.add(f"D1:D{ws.max_row}",FormulaRule(formula=[fail_formula],fill=solid_fill(red_fill))) # Add it the DS Tab, so we can quickly see failures throughout the DS
+    return ws
+
+# DATASHEET CACHE ########################################################################### NOTE Techs re-run the same asset a lot (fixed trace, new template...), and the PDF parse costs more than everything else put together
+def parse_datasheet(ds_file, workers=1, extractor=None):                                    # The full, uncached parse: {"rows": filtered table, "parameters": [[name, first row, last row]], "failures": [rows], "worst": {name: worst failure}}, or None if the PDF had no tables
+    tables = iter_ds_tables(ds_file, workers, extractor)                                    # Page tables, pulled lazily
+    first = next(tables, None)                                                              # Make sure that processed okay
+    if first is None:                                                                       # (no tables anywhere in the useful part of the PDF)
+        return None
+    ds_rows, bar_rows = filter_ds_table(chain([first], tables))                             # Just the test results; pages stop being opened once it hits "Decision Rule"
+    return {"rows": ds_rows, **analyze_datasheet(ds_rows, bar_rows)}
+
+def prune_ds_cache():                                                                       # LRU eviction: drop the least recently used entries until the cache fits in ds_cache_max_bytes
+    entries = sorted(ds_cache_dir.glob("*.json"), key=lambda f: f.stat().st_mtime)          # Oldest first; a hit touches the file, so mtime IS last use
+    total = sum(f.stat().st_size for f in entries)                                          # How big are we?
+    for entry in entries:                                                                   # Starting with the stalest,
+        if total <= ds_cache_max_bytes:                                                     # (once we fit, we're done)
+            break
+        total -= entry.stat().st_size                                                       # knock it off the total
+        entry.unlink(missing_ok=True)                                                       # and off the disk (another process may have beaten us to it)
+
+def load_datasheet(ds_file, workers=1, extractor=None):                                     # parse_datasheet(), but from the on-disk cache whenever we've seen this exact PDF before
+    digest = hashlib.sha256(ds_file.read_bytes()).hexdigest()                               # Content hash: a re-saved or renamed copy of the same PDF still hits
+    extractor = extractor or ds_extractor
+    cache_file = ds_cache_dir / f"{digest}-v{ds_parser_version}{'' if extractor == 'table' else '-' + extractor}.json" # Parser version (and any non-reference backend) in the name, so parser changes never serve stale results
+    try:                                                                                    # Seen it before?
+        datasheet = json.loads(cache_file.read_text(encoding="utf-8"))                      # Then that's the whole parse, done
+        os.utime(cache_file)                                                                # Mark it as recently used, for the LRU
+        return datasheet
+    except (OSError, ValueError):                                                           # Not cached (or the cache file is junk),
+        pass                                                                                # so parse it for real
+    datasheet = parse_datasheet(ds_file, workers, extractor)                                # The slow bit
+    if datasheet is not None:                                                               # Only cache real results
+        try:                                                                                # Same deal as the template cache: can't write it, no big deal
+            ds_cache_dir.mkdir(parents=True, exist_ok=True)                                 # Make sure the cache dir is there
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")                        # Write to a temp file first,
+            tmp_file.write_text(json.dumps(datasheet), encoding="utf-8")
+            os.replace(tmp_file, cache_file)                                                # then swap it in, so parallel workers never read half a file
+            prune_ds_cache()                                                                # And keep the cache from growing forever
+        except OSError:                                                                     # Couldn't write it?
+            pass                                                                            # Oh well, next run parses again
+    return datasheet
+
+# SAMPLING ##################################################################################
+group_size_column = "AK"                                                                    # Just past Notes (AJ); how many assets each visible row is standing in for
+group_size_header = "Assets Represented"                                                    # Its header, in row 9 with the rest
+
+def product_sort_key(product):                                                              # Products sort alphabetically, with blank products last (instead of crashing the sort on None)
+    return (product is None, str(product) if product is not None else "")
+
+def sample_products(table_data, product_index=1):                                           # The sample: one representative asset per product (mfgr/model pair), in a single hash pass over the trace
+    groups = {}                                                                             # product: [asset indexes, in trace order]
+    blanks = []                                                                             # Assets without a DUT ID - nothing to analyze, they go to the bottom
+    for i, row in enumerate(table_data):                                                    # One pass over every asset
+        if row[0] is None:                                                                  # No DUT ID?
+            blanks.append(i)                                                                # Set it aside
+        else:
+            groups.setdefault(row[product_index], []).append(i)                             # Otherwise, into its product's group
+    order = []                                                                              # New asset order: grouped by product
+    represents = []                                                                         # Lines up with order: group size on the representative, 0 on the rest, None on blanks
+    for product in sorted(groups, key=product_sort_key):                                    # Only the unique products get sorted, not every asset
+        members = groups[product]                                                           # First asset of the product in trace order is the representative, so reruns always pick the same one
+        order.extend(members)                                                               # Representative first, then the rest of its group
+        represents.append(len(members))                                                     # The representative stands for the whole group,
+        represents.extend([0] * (len(members) - 1))                                         # ...and the rest are sampled out
+    order.extend(blanks)                                                                    # Blanks at the very end
+    represents.extend([None] * len(blanks))
+    return order, represents
+
+def add_group_size_column(ws, represents, end_row):                                         # Write each representative's group size into group_size_column, styled like the Notes column next to it
+    from openpyxl.utils import column_index_from_string
+    from openpyxl.worksheet.table import TableColumn
+    col = column_index_from_string(group_size_column)                                       # Column number for the group sizes
+    notes = col - 1                                                                         # Notes (AJ) - we borrow its styling
+    header = ws.cell(row=start_row - 1, column=col, value=group_size_header)                # Header cell,
+    header._style = copy(ws.cell(row=start_row - 1, column=notes)._style)                   # dressed like the other headers
+    for i, count in enumerate(represents):                                                  # Each asset row
+        cell = ws.cell(row=start_row + i, column=col, value=count or None)                  # Only representatives get a number
+        cell._style = copy(ws.cell(row=start_row + i, column=notes)._style)                 # Match the row's look
+    for table in ws.tables.values():                                                        # If the ImpactAnalysis table is on this sheet,
+        if table.ref.split(":")[1].startswith("AJ"):                                        # and doesn't already have the column,
+            table.ref = f"A{start_row - 1}:{group_size_column}{end_row}"                    # stretch it to cover the new column
+            table.autoFilter.ref = table.ref                                                # (and its filter)
+            table.tableColumns.append(TableColumn(id=len(table.tableColumns) + 1, name=group_size_header))
+
+# ANALYSIS SIZING ###########################################################################
+_translators = {}                                                                           # (formula, origin cell): Translator; parsing the formula costs far more than moving it, and we move the same few formulas a lot
+
+def move_formula(formula, origin, target):                                                  # Translator(formula, origin).translate_formula(target), parsing each formula once
+    translator = _translators.get((formula, origin))
+    if translator is None:
+        from openpyxl.formula.translate import Translator
+        if len(_translators) > 4096:                                                        # Long-running watch mode shouldn't hoard every formula it ever saw
+            _translators.clear()
+        translator = _translators[formula, origin] = Translator(formula, origin=origin)
+    return translator.translate_formula(target)
+
+def resize_ref(ref, end_row, from_row=template_end_row):                                    # Swap the old last analysis row for ours in a range/formula string, e.g. "A10:AJ5008" -> "A10:AJ49"
+    return re.sub(rf"(:\$?[A-Z]{{1,3}}\$?){from_row}(?!\d)", rf"\g<1>{end_row}", ref)       # Only the end of a range, so we never touch an actual value of 5008 (or the start row, on a one-asset sheet)
+
+def size_analysis_sheet(ws, end_row, from_row=template_end_row):                            # Grow or trim the analysis rows (and everything that points at them) from ending at from_row (the template's, by default) to ending at end_row
+    if end_row < from_row:                                                                  # Smaller trace than the template (the usual case):
+        ws.delete_rows(end_row + 1, from_row - end_row)                                     # drop the unused template rows outright, rather than hiding thousands of them
+        for row in [r for r in ws.row_dimensions if r > end_row]:                           # And their row formatting,
+            del ws.row_dimensions[row]                                                      # so the file doesn't carry 5k empty row records
+    elif end_row > from_row:                                                                # Bigger trace than the template:
+        last_cells = [cell for cell in ws[from_row] if cell.has_style or cell.value is not None] # Use the last analysis row as the pattern for new ones
+        for row in range(from_row + 1, end_row + 1):                                        # Each row we need to add
+            for src in last_cells:                                                          # Each cell of the pattern row
+                value = src.value                                                           # Constants copy as-is,
+                if isinstance(value, str) and value.startswith("="):                        # but formulas need their row references moved down
+                    value = move_formula(value, src.coordinate, f"{src.column_letter}{row}")
+                new_cell = ws.cell(row=row, column=src.column, value=value)                 # Make the cell
+                new_cell._style = copy(src._style)                                          # and share the pattern's style (same thing copy_worksheet does)
+            ws.row_dimensions[row].height = ws.row_dimensions[from_row].height              # Keep the row height consistent
+    point_at_last_row(ws, end_row, from_row)
+
+def point_at_last_row(ws, end_row, from_row=template_end_row):                              # Everything that spans the analysis rows (CF, drop downs, the table, the header block's summaries) ends at end_row instead of from_row
+    from openpyxl.formatting.formatting import ConditionalFormattingList
+    from openpyxl.worksheet.cell_range import MultiCellRange
+    rules = ws.conditional_formatting                                                       # The template's own conditional formatting
+    ws.conditional_formatting = ConditionalFormattingList()                                 # gets rebuilt over the new range,
+    for cf in rules:                                                                        # one range at a time,
+        for rule in cf.rules:                                                               # with the same rules (and priorities)
+            ws.conditional_formatting.add(resize_ref(str(cf.sqref), end_row, from_row), rule)
+    for dv in ws.data_validations.dataValidation:                                           # The template's drop downs
+        dv.sqref = MultiCellRange(resize_ref(str(dv.sqref), end_row, from_row))             # cover just our rows
+    for table in ws.tables.values():                                                        # The ImpactAnalysis table
+        table.ref = resize_ref(table.ref, end_row, from_row)                                # ends where we do
+        if table.autoFilter is not None:                                                    # and so does its filter
+            table.autoFilter.ref = resize_ref(table.autoFilter.ref, end_row, from_row)
+    for row in ws.iter_rows(min_row=1, max_row=start_row - 1):                              # The header block has summary formulas (e.g. SUBTOTAL(103,$A$10:$A$5008))
+        for cell in row:
+            if isinstance(cell.value, str) and cell.value.startswith("="):                  # that need the new range as well
+                cell.value = resize_ref(cell.value, end_row, from_row)
+
+# SHEET STAMPING ############################################################################ NOTE copy_worksheet() builds every cell through ws.cell() and copies every style; with a dozen failed parameters that was most of the run
+def stamp_sheet(source, title, shared_from=None):                                           # copy_worksheet(), minus the overhead: same cells, dims and page setup; CF, DV and images shared with the first stamped sheet
+    from openpyxl.cell.cell import Cell
+    ws = source.parent.create_sheet(title)                                                  # New sheet, at the end, like copy_worksheet()
+    cells = ws._cells                                                                       # Straight into the cell store, skipping ws.cell()'s lookups
+    new_cell = Cell.__new__                                                                 # and Cell.__init__()'s value sniffing; the source values are already typed
+    for (row, col), source_cell in source._cells.items():                                   # Every cell the source has (merged ones become plain cells, same as copy_worksheet())
+        cell = new_cell(Cell)
+        cell.parent, cell.row, cell.column = ws, row, col
+        cell._value, cell.data_type = source_cell._value, source_cell.data_type
+        cell._style = source_cell._style                                                    # NOTE shared StyleArray: restyle a stamped cell by assigning a fresh _style, never in place
+        cell._hyperlink = copy(source_cell._hyperlink) if getattr(source_cell, "_hyperlink", None) else None
+        cell._comment = copy(source_cell._comment) if getattr(source_cell, "_comment", None) else None
+        cells[row, col] = cell
+    for attr in ("row_dimensions", "column_dimensions"):                                    # Heights, widths, hidden rows
+        target = getattr(ws, attr)
+        for key, dim in getattr(source, attr).items():
+            target[key] = copy(dim)
+            target[key].worksheet = ws
+    ws.sheet_format = copy(source.sheet_format)                                             # And the rest of what copy_worksheet() carries over
+    ws.sheet_properties = copy(source.sheet_properties)
+    ws.merged_cells = copy(source.merged_cells)
+    ws.page_margins = copy(source.page_margins)
+    ws.page_setup = copy(source.page_setup)
+    ws.print_options = copy(source.print_options)
+    if shared_from is not None:                                                             # Every parameter sheet gets the same rules, so they all point at one set of objects
+        ws.conditional_formatting = shared_from.conditional_formatting                      # (the writer only reads these, and the dxf ids come out the same for every sheet)
+        ws.data_validations = shared_from.data_validations
+        for img in shared_from._images:                                                     # Images can't be shared (the writer numbers each one as it goes),
+            image = copy(img)                                                               # but a shallow copy reuses the already-loaded logo
+            if isinstance(img.ref, BytesIO):                                                # (one read back out of a saved workbook is a buffer the writer closes, so each copy gets its own)
+                image.ref = BytesIO(img.ref.getvalue())
+            ws.add_image(image, img.anchor)
+    return ws
+
+# COMPACT OUTPUT ############################################################################ NOTE --compact: every per-row formula gets written once per column instead of once per row, so the file is smaller and Excel opens it faster
+SharedFormula = None                                                                        # Built by shared_formula_class(), since it has to subclass one of openpyxl's
+
+def shared_formula_class():                                                                 # openpyxl can read shared formulas but not write them; it does write <f> attributes for array formulas, so we ride along on that
+    global SharedFormula
+    if SharedFormula is None:
+        from openpyxl.worksheet.formula import ArrayFormula
+
+        class SharedFormula(ArrayFormula):
+            t = "shared"
+
+            def __init__(self, ref=None, si=0, text=None):                                  # The anchor cell carries ref (the whole run) and the formula text; the rest of the run just carries si
+                super().__init__(ref, text)
+                self.si = si
+
+            def __iter__(self):                                                             # The <f> attributes
+                yield "t", self.t
+                if self.ref:
+                    yield "ref", self.ref
+                yield "si", str(self.si)
+    return SharedFormula
+
+def share_formulas(ws):                                                                     # Turn every run of rows that holds the same formula (relative refs shifted row by row) into one shared formula. Returns how many cells got shared
+    from openpyxl.utils import get_column_letter
+    from openpyxl.formula.translate import Translator
+    SharedFormula = shared_formula_class()
+    cells = ws._cells
+    columns = {}                                                                            # column: [rows with a plain formula]
+    for (row, col), cell in cells.items():
+        if cell.data_type == "f" and isinstance(cell._value, str):                          # (array formulas and the like stay as they are)
+            columns.setdefault(col, []).append(row)
+    si, shared = 0, 0                                                                       # Shared formula ids are per sheet
+    for col, rows in columns.items():
+        letter = get_column_letter(col)
+        rows.sort()
+        i = 0
+        while i < len(rows):                                                                # Each run starts at an anchor cell...
+            anchor = cells[rows[i], col]
+            translator = Translator(anchor._value, origin=f"{letter}{rows[i]}")
+            j = i + 1
+            while (j < len(rows) and rows[j] == rows[j - 1] + 1                             # ...and keeps going down the column as long as the next row is
+                and cells[rows[j], col]._value == translator.translate_formula(f"{letter}{rows[j]}")): # exactly the anchor's formula, moved down
+                j += 1
+            if j - i > 1:                                                                   # A run worth sharing
+                anchor._value = SharedFormula(f"{letter}{rows[i]}:{letter}{rows[j - 1]}", si, anchor._value)
+                for row in rows[i + 1:j]:
+                    cells[row, col]._value = SharedFormula(si=si)
+                si += 1
+                shared += j - i
+            i = j
+    return shared
+
+def output_report(final_xlsx, wb, cells=None):                                              # One line on what we just wrote, so we can keep an eye on file sizes
+    if cells is None:                                                                       # (--stream counts its own, since its sheets never held most of theirs)
+        cells = sum(len(ws._cells) for ws in wb.worksheets)                                 # Every cell record in the file
+    size = final_xlsx.stat().st_size
+    return f"Saved {final_xlsx.name}: {size / 1024:,.0f} KB, {cells:,} cells in {len(wb.worksheets)} sheets"
+
+# STREAMING OUTPUT ########################################################################## NOTE --stream: fleet-wide standards have traces in the tens of thousands of rows, and a cell object per value per sheet ran to gigabytes. Here the sheets only ever hold their header block and pattern rows; the asset rows get built one at a time as they're written out
+stream_chunk_rows = 1000                                                                    # Rev trace rows per pickled chunk in the spool file
+rt_kept_columns = {0, 3, 5, 6, 7, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18}                    # What --stream keeps of the rev trace in memory: A (the row count), the header block's D/F/G/H, and everything rt_col_map or the index reads
+StreamingWriter = None                                                                      # Built by streaming_writer_class(), since it has to subclass one of openpyxl's
+
+def spool_reverse_trace(rev_trace_file, spool):                                             # read_reverse_trace() in one streaming pass: every row gets pickled to spool in chunks (for the Reverse Trace tab), and only rt_kept_columns come back, the rest None
+    from openpyxl import load_workbook
+    rt_wb = load_workbook(rev_trace_file, read_only=True)
+    rt_ws = rt_wb["Reverse Trace - UID"]
+    kept = {i: [] for i in rt_kept_columns}
+    chunk, blanks, width = [], [], 0
+    for row in rt_ws.iter_rows(values_only=True):                                           # One row in memory at a time (plus the current chunk)
+        if all(value is None for value in row):                                             # Maybe one of FSM's trailing formatted-but-empty rows; hold it until we know if anything follows
+            blanks.append(row)
+            continue
+        for held in blanks + [row]:
+            for i, column in kept.items():
+                column.append(held[i] if i < len(held) else None)
+            chunk.append(held)
+            width = max(width, len(held))
+        blanks = []
+        if len(chunk) >= stream_chunk_rows:
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            chunk = []
+    rt_wb.close()
+    if chunk:
+        pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+    if not kept[0]:                                                                         # Empty trace, same as read_reverse_trace()
+        return []
+    return [tuple(kept[i]) if i in kept else None for i in range(max(width, max(rt_kept_columns) + 1))]
+
+def iter_spool(spool):                                                                      # The spooled rev trace rows back, in order, a chunk at a time
+    spool.seek(0)
+    while True:
+        try:
+            chunk = pickle.load(spool)
+        except EOFError:
+            return
+        yield from chunk
+
+def trim_to_patterns(ws, end_row):                                                          # Cut an analysis sheet down to its header block and the rows analysis_rows() builds from (first asset row, a regular one, the template's last), with everything spanning the rows pointed at end_row
+    patterns = (start_row, start_row + 1, template_end_row)
+    for key in [key for key in ws._cells if key[0] > start_row + 1 and key[0] not in patterns]:
+        del ws._cells[key]
+    for row in [row for row in ws.row_dimensions if row > start_row + 1 and row not in patterns]:
+        del ws.row_dimensions[row]
+    point_at_last_row(ws, end_row)
+
+def streamed_dimension(ws, last_row):                                                       # The used range the streamed sheet will have: its own columns, down to last_row
+    first, last = ws.calculate_dimension().split(":")
+    return f"{first}:{last.rstrip('0123456789')}{last_row}"
+
+def stream_cell(ws, row, src):                                                              # A fresh cell at (row, src's column) with src's value and style; the style is copied, because binding a date can change a cell's number format in place
+    from openpyxl.cell.cell import Cell
+    cell = Cell.__new__(Cell)
+    cell.parent, cell.row, cell.column = ws, row, src.column
+    cell._value, cell.data_type, cell._style = src._value, src.data_type, copy(src._style)
+    cell._hyperlink = cell._comment = None
+    return cell
+
+def sheet_rows(ws):                                                                         # {row: [cells, in column order]} for what the sheet does hold
+    rows = {}
+    for (row, _), cell in sorted(ws._cells.items()):
+        rows.setdefault(row, []).append(cell)
+    return rows
+
+def analysis_rows(ws, table_data, represents, last_row_in_range, end_row):                  # An analysis sheet's rows, (row, [cells], RowDimension), built just in time: the header block as-is, then each asset's row from the pattern rows, the way import_oot() and size_analysis_sheet() leave them in the full model
+    from openpyxl.cell.cell import Cell
+    from openpyxl.styles.cell_style import StyleArray
+    from openpyxl.utils import column_index_from_string
+    from openpyxl.worksheet.dimensions import RowDimension
+    rows, dims = sheet_rows(ws), ws.row_dimensions
+    for row in range(1, start_row):                                                         # The header block
+        if row in rows or row in dims:
+            yield row, rows.get(row, []), dims.get(row)
+    dst_columns = [column_index_from_string(dst) for _, dst in rt_col_map]
+    group_col = column_index_from_string(group_size_column)
+    point_cols = [(column_index_from_string(col), col) for col in test_point_columns]
+    date_styles = {}                                                                        # {pattern row: column C's style with the date format forced on}
+    for row in range(start_row, end_row + 1):
+        i = row - start_row
+        pattern = start_row if row == start_row else start_row + 1 if row < template_end_row else template_end_row # Same rows the full model would have: the template's own up to its last row, then copies of that
+        cells = {}
+        for src in rows.get(pattern, ()):
+            cell = cells[src.column] = stream_cell(ws, row, src)
+            if row != pattern and isinstance(cell._value, str) and cell._value.startswith("="): # (move_formula() caches the parse, so this is cheap after the first row)
+                cell._value = move_formula(cell._value, src.coordinate, f"{src.column_letter}{row}")
+        if i < len(table_data):                                                             # write_rows()
+            for col, value in zip(dst_columns, table_data[i]):
+                if value is not None:
+                    cell = cells.get(col) or cells.setdefault(col, Cell(ws, row=row, column=col))
+                    cell.value = value
+            notes = cells.get(group_col - 1)                                                # add_group_size_column()
+            cells[group_col] = Cell(ws, row=row, column=group_col, value=represents[i] or None)
+            cells[group_col]._style = copy(notes._style) if notes is not None else StyleArray()
+        if start_row < row <= last_row_in_range:                                            # The clean up after the import
+            if pattern not in date_styles:
+                probe = Cell(ws, row=row, column=3)
+                probe._style = copy(cells[3]._style) if 3 in cells else StyleArray()
+                probe.number_format = 'MM/DD/YYYY'
+                date_styles[pattern] = probe._style
+            cell = cells.get(3) or cells.setdefault(3, Cell(ws, row=row, column=3))
+            cell._style = copy(date_styles[pattern])
+            for col, letter in point_cols:
+                cell = cells.get(col) or cells.setdefault(col, Cell(ws, row=row, column=col))
+                cell.value = f'=IF(${letter}${start_row}="","",${letter}${start_row})'
+        if row <= template_end_row:                                                         # Template rows keep their own formatting,
+            dim = dims.get(pattern)
+        else:                                                                               # and added rows just get the height
+            dim = RowDimension(ws, index=row, ht=dims[template_end_row].height if template_end_row in dims else None)
+        if i < len(represents) and not represents[i]:                                       # Sampled out (or blank)
+            dim = copy(dim) if dim is not None else RowDimension(ws, index=row)
+            dim.hidden = True
+        yield row, [cells[col] for col in sorted(cells)], dim
+
+def reverse_trace_rows(ws, trace_rows):                                                     # The Reverse Trace tab's rows: the spooled trace over the template's own cells (styles, and whatever the trace leaves blank), then any template rows past the end
+    from openpyxl.cell.cell import Cell
+    rows, dims = sheet_rows(ws), ws.row_dimensions
+    last = 0
+    for last, values in enumerate(trace_rows, start=1):
+        cells = {src.column: stream_cell(ws, last, src) for src in rows.get(last, ())}
+        for col, value in enumerate(values, start=1):
+            if value is not None:
+                cell = cells.get(col) or cells.setdefault(col, Cell(ws, row=last, column=col))
+                cell.value = value
+        if cells or last in dims:
+            yield last, [cells[col] for col in sorted(cells)], dims.get(last)
+    for row in sorted(set(rows) | set(dims)):
+        if row > last:
+            yield row, rows.get(row, []), dims.get(row)
+
+def write_streamed_sheet(ws, rows, dimension):                                              # WorksheetWriter.write(), but with the rows from rows ((row, [cells], RowDimension) in order) instead of ws._cells. Returns the writer and how many cells it wrote
+    from openpyxl.cell._writer import write_cell
+    from openpyxl.worksheet._writer import WorksheetWriter
+    from openpyxl.worksheet.dimensions import SheetDimension
+    writer = WorksheetWriter(ws)                                                            # Writes to a temp file as it goes, so nothing piles up in memory
+    writer.write_properties()
+    writer.xf.send(SheetDimension(dimension).to_tree())                                     # (ws's own would only cover what it holds)
+    writer.write_views()
+    writer.write_format()
+    writer.write_cols()
+    xf = writer.xf.send(True)
+    written = 0
+    with xf.element("sheetData"):
+        for row, cells, dim in rows:
+            attrs = {"r": str(row)}
+            attrs.update(dim or {})                                                         # Same as WorksheetWriter.write_row()
+            with xf.element("row", attrs):
+                for cell in cells:
+                    if cell._value is not None or cell.has_style:
+                        write_cell(xf, ws, cell, cell.has_style)
+                        written += 1
+    writer.xf.send(None)
+    writer.write_tail()                                                                     # CF, drop downs, drawings, tables: all straight off ws
+    writer.close()
+    return writer, written
+
+def streaming_writer_class():                                                               # openpyxl's ExcelWriter, but the sheets it's given row sources for get written by write_streamed_sheet()
+    global StreamingWriter
+    if StreamingWriter is None:
+        from openpyxl.writer.excel import ExcelWriter
+        from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+
+        class StreamingWriter(ExcelWriter):
+            def __init__(self, workbook, archive, row_sources):                             # row_sources: {sheet title: (rows, dimension ref)}
+                super().__init__(workbook, archive)
+                self.row_sources = row_sources
+                self.streamed_cells = 0
+
+            def write_worksheet(self, ws):                                                  # Same steps as ExcelWriter.write_worksheet()
+                if ws.title not in self.row_sources:
+                    return super().write_worksheet(ws)
+                ws._drawing = SpreadsheetDrawing()
+                ws._drawing.charts = ws._charts
+                ws._drawing.images = ws._images
+                writer, written = write_streamed_sheet(ws, *self.row_sources[ws.title])
+                self.streamed_cells += written
+                ws._rels = writer._rels
+                self._archive.write(writer.out, ws.path[1:])
+                self.manifest.append(ws)
+                writer.cleanup()
+    return StreamingWriter
+
+def save_streamed(wb, final_xlsx, row_sources):                                             # wb.save(final_xlsx), streaming the sheets in row_sources. Returns how many cells the streamed sheets came to
+    from zipfile import ZipFile, ZIP_DEFLATED
+    wb.properties.modified = datetime.utcnow()                                              # (what save_workbook() does)
+    writer = streaming_writer_class()(wb, ZipFile(final_xlsx, "w", ZIP_DEFLATED, allowZip64=True), row_sources)
+    writer.save()
+    return writer.streamed_cells
+
+# PARALLEL SAVE ############################################################################# NOTE Every parameter sheet is a stamp of the same analysis, and only its header block changes after stamping (write_worst_error()), so the 5k asset rows get turned into XML once and reused. What's left per sheet is deflating it, which zlib does outside the GIL, so that runs in threads
+SharedBodyWriter = None                                                                     # Built by shared_body_writer_class(), since it has to subclass one of openpyxl's
+
+class PartArchive:                                                                          # Stands in for the ZipFile that openpyxl's ExcelWriter writes into: holds each part as byte chunks (so sheets can share their body), then deflates them in parallel and writes the zip itself
+    def __init__(self, path, workers=1):
+        self.path, self.workers, self.parts = path, workers, []
+
+    def writestr(self, arcname, data):                                                      # ZipFile.writestr(), as openpyxl calls it
+        self.parts.append((arcname, [data.encode("utf-8") if isinstance(data, str) else data]))
+
+    def write(self, filename, arcname=None):                                                # ZipFile.write(); openpyxl deletes the file right after, so read it now
+        self.parts.append((arcname or str(filename), [Path(filename).read_bytes()]))
+
+    def write_chunks(self, arcname, chunks):                                                # A part made of several byte strings, written one after another
+        self.parts.append((arcname, chunks))
+
+    def namelist(self):
+        return [name for name, _ in self.parts]
+
+    def close(self):                                                                        # ExcelWriter.save() calls this once everything's in
+        from concurrent.futures import ThreadPoolExecutor
+        if sum(len(chunk) for _, chunks in self.parts for chunk in chunks) >= 0x7FFFFFFF:   # Anywhere near 4 GB needs zip64, which we don't write; hand it to zipfile instead
+            from zipfile import ZipFile, ZIP_DEFLATED
+            with ZipFile(self.path, "w", ZIP_DEFLATED, allowZip64=True) as archive:
+                for name, chunks in self.parts:
+                    archive.writestr(name, b"".join(chunks))
+            return
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as pool:
+            write_zip(self.path, [name for name, _ in self.parts], pool.map(deflate_part, [chunks for _, chunks in self.parts]))
+
+def deflate_part(chunks):                                                                   # Worker: (raw deflate, CRC-32, size) of one part, which is what a zip member needs
+    packer = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)               # (-15: no zlib header, same as ZipFile's ZIP_DEFLATED)
+    crc, size, out = 0, 0, []
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        out.append(packer.compress(chunk))
+    out.append(packer.flush())
+    return b"".join(out), crc, size
+
+def write_zip(path, names, members):                                                        # A plain (non-zip64) zip of already deflated members, in order: (data, crc, size) per name
+    now = datetime.now()
+    dos_time = now.hour << 11 | now.minute << 5 | now.second // 2
+    dos_date = (now.year - 1980) << 9 | now.month << 5 | now.day
+    central = []
+    with open(path, "wb") as out:
+        for name, (data, crc, size) in zip(names, members):
+            raw_name = name.encode("utf-8")
+            flags = 0 if raw_name.isascii() else 0x800                                      # (bit 11: the name is UTF-8)
+            offset = out.tell()
+            out.write(struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, flags, 8, dos_time, dos_date, crc, len(data), size, len(raw_name), 0) + raw_name)
+            out.write(data)
+            central.append(struct.pack("<4s6H3L5H2L", b"PK\x01\x02", 20, 20, flags, 8, dos_time, dos_date, crc, len(data), size, len(raw_name), 0, 0, 0, 0, 0, offset) + raw_name)
+        start = out.tell()
+        out.write(b"".join(central))
+        out.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, len(central), len(central), out.tell() - start, start, 0))
+
+def sheet_xml(ws, rows, body=None):                                                         # A worksheet part as [head, body, tail], the way WorksheetWriter.write() would write it, with rows ([(row, [cells])]) as the header block; body is the shared asset rows' XML, or None to render them from ws here. Returns (chunks, writer)
+    from openpyxl.worksheet._writer import WorksheetWriter
+    from openpyxl.xml.functions import xmlfile
+    writer = WorksheetWriter(ws, out=BytesIO())
+    writer.write_top()
+    xf = writer.xf.send(True)
+    with xf.element("sheetData"):
+        for row, cells in rows:
+            if row < start_row:
+                writer.write_row(xf, cells, row)
+        with xf.element("sharedBody"):                                                      # Placeholder; split out below
+            pass
+    writer.xf.send(None)
+    if body is None:                                                                        # The asset rows, on their own, before the tail (which writes out the hyperlinks they collect)
+        out = BytesIO()
+        with xmlfile(out) as body_xf:
+            with body_xf.element("sheetData"):
+                for row, cells in rows:
+                    if row >= start_row:
+                        writer.write_row(body_xf, cells, row)
+        body = out.getvalue()[len(b"<sheetData>"):-len(b"</sheetData>")]
+    writer.write_tail()
+    writer.close()
+    head, tail = re.split(rb"<sharedBody\s*/>|<sharedBody>\s*</sharedBody>", writer.out.getvalue())
+    return [head, body, tail], writer
+
+def shared_body_writer_class():                                                             # openpyxl's ExcelWriter, but the sheets it's told share their rows only get those rows turned into XML once
+    global SharedBodyWriter
+    if SharedBodyWriter is None:
+        from openpyxl.writer.excel import ExcelWriter
+        from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+
+        class SharedBodyWriter(ExcelWriter):
+            def __init__(self, workbook, archive, shared):                                  # shared: titles of the sheets with the same asset rows
+                super().__init__(workbook, archive)
+                self.shared = shared
+                self.body = None                                                            # The first shared sheet's asset rows, as XML
+
+            def write_worksheet(self, ws):                                                  # Same steps as ExcelWriter.write_worksheet()
+                if ws.title not in self.shared or self.body is False:
+                    return super().write_worksheet(ws)
+                ws._drawing = SpreadsheetDrawing()
+                ws._drawing.charts = ws._charts
+                ws._drawing.images = ws._images
+                if self.body is None:                                                       # First one: every row, and keep the asset rows
+                    rows = sheet_rows(ws)
+                    rows = sorted(chain(rows.items(), ((row, []) for row in ws.row_dimensions.keys() - rows.keys())))
+                    chunks, writer = sheet_xml(ws, rows)
+                    self.body = chunks[1] if not ws._hyperlinks and not ws._comments else False # (the rest can't reuse rows that carry their own links or comments)
+                else:                                                                       # The rest: just their header block
+                    rows = {}
+                    for key in [key for key in ws._cells if key[0] < start_row]:
+                        rows.setdefault(key[0], []).append(ws._cells[key])
+                    rows = sorted(chain(((row, sorted(cells, key=lambda cell: cell.column)) for row, cells in rows.items()),
+                        ((row, []) for row in ws.row_dimensions if row < start_row and row not in rows)))
+                    chunks, writer = sheet_xml(ws, rows, self.body)
+                ws._rels = writer._rels
+                self._archive.write_chunks(ws.path[1:], chunks)
+                self.manifest.append(ws)
+    return SharedBodyWriter
+
+def save_shared(wb, final_xlsx, shared, workers=1):                                         # wb.save(final_xlsx), with the sheets titled in shared writing their asset rows once between them, and the parts deflated by workers threads
+    wb.properties.modified = datetime.utcnow()                                              # (what save_workbook() does)
+    shared_body_writer_class()(wb, PartArchive(final_xlsx, workers), set(shared)).save()
+
+# STAGE TIMING ############################################################################## NOTE --profile (and benchmark.py) install a StageTimer; import_oot() calls lap() between its stages, which costs nothing when nobody's timing
+pipeline_stages = ["template", "read", "copy", "sort", "formulas", "pdf", "sheets", "save"] # import_oot()'s stages, in the order they run
+
+def reset_peak_rss():                                                                       # Start a new high-water mark for peak_rss_mb(); False where that can't be done (anywhere but Linux), and the peak is the whole process' so far
+    try:
+        with open("/proc/self/clear_refs", "w") as refs:                                    # 5 resets VmHWM to the current RSS
+            refs.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():                                                                          # High-water mark of this process' memory, in MB, since the last reset_peak_rss() (None where the OS won't tell us)
+    try:
+        with open("/proc/self/status") as status:                                           # Linux: VmHWM is the one reset_peak_rss() resets
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)                            # (in kB)
+    except OSError:
+        pass
+    if not HAVE_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss                               # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class StageTimer:                                                                           # Wall time, CPU time, peak RSS and rows/pages per pipeline stage, measured lap by lap
+    def __init__(self, profile_stages=()):
+        self.stages = {}                                                                    # {stage: {"wall", "cpu", "peak_rss_mb", counts...}}, in the order the stages ran
+        self.stage_peaks = reset_peak_rss()                                                 # Can each stage get its own peak? If not, "peak_rss_mb" is the process' peak so far, and only ever goes up
+        self.profile_stages = set(profile_stages)                                           # Stages to run under cProfile
+        self.profiles = {}                                                                  # {stage: cProfile.Profile}
+        self.start(pipeline_stages[0])                                                      # The first stage starts now
+
+    def start(self, name):                                                                  # Start timing the stage called name
+        self.counts = {}                                                                    # Rows/pages/etc. tallied during this stage
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        if self.stage_peaks:
+            reset_peak_rss()
+        self.profiler = None
+        if name in self.profile_stages:                                                     # Only the stages asked for pay for the profiler
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def tally(self, **counts):                                                              # Count things (rows, pages, sheets) against the current stage
+        for key, n in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    def absorb(self, record):                                                               # Count a stage that ran in a worker process (see input_job()) against the current one: its counts, plus its own wall/CPU time
+        counts = {key: n for key, n in record.items() if key not in ("wall", "cpu", "peak_rss_mb")}
+        self.tally(**counts, worker_wall=record["wall"], worker_cpu=record["cpu"])
+
+    def lap(self, name, **counts):                                                          # Close out the current stage, book it to name, and start the next one
+        wall, cpu = time.perf_counter() - self.wall, time.process_time() - self.cpu         # NOTE CPU time is this process only; --ds-workers' pool shows up as wall time
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiles[name] = self.profiler
+        self.tally(**counts)
+        record = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})                    # (stages can run more than once, e.g. per asset in a batch)
+        record["wall"] += wall
+        record["cpu"] += cpu
+        peak = peak_rss_mb()
+        record["peak_rss_mb"] = peak if record.get("peak_rss_mb") is None else max(record["peak_rss_mb"], peak) # Worst of any run of this stage
+        for key, n in self.counts.items():
+            record[key] = record.get(key, 0) + n
+        following = pipeline_stages.index(name) + 1 if name in pipeline_stages else len(pipeline_stages)
+        self.start(pipeline_stages[following % len(pipeline_stages)])                       # (after "save", the next asset's "template")
+
+    def table(self):                                                                        # The human-readable version
+        lines = [f"{'Stage':<10}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS (MB)' if self.stage_peaks else 'RSS so far (MB)':>16}  Processed"]
+        for name, record in self.stages.items():
+            processed = ", ".join(f"{n:,.3f} {key}" if isinstance(n, float) else f"{n:,} {key}" for key, n in record.items() if key not in ("wall", "cpu", "peak_rss_mb"))
+            rss = "-" if record["peak_rss_mb"] is None else f"{record['peak_rss_mb']:,.1f}"
+            lines.append(f"{name:<10}{record['wall']:>10.3f}{record['cpu']:>10.3f}{rss:>16}  {processed}")
+        total_wall = sum(record["wall"] for record in self.stages.values())
+        total_cpu = sum(record["cpu"] for record in self.stages.values())
+        lines.append(f"{'total':<10}{total_wall:>10.3f}{total_cpu:>10.3f}")
+        if not self.stage_peaks:                                                            # (no per-stage reset on this OS)
+            lines.append("RSS so far: the process' peak up to the end of each stage, not the stage's own")
+        return "\n".join(lines)
+
+    def write(self, final_xlsx):                                                            # The machine-readable version, next to the workbook, plus any cProfile dumps. Returns the JSON's path
+        profile_json = final_xlsx.with_suffix(".profile.json")                              # OOT_{UID}.profile.json
+        stages = {name: {key: round(value, 4) if isinstance(value, float) else value for key, value in record.items()} for name, record in self.stages.items()}
+        for name, profiler in self.profiles.items():                                        # OOT_{UID}.{stage}.prof, for snakeviz/pstats
+            prof_file = final_xlsx.with_suffix(f".{name}.prof")
+            profiler.dump_stats(prof_file)
+            stages[name]["cprofile"] = prof_file.name
+        report = {"workbook": final_xlsx.name, "when": datetime.now().isoformat(timespec="seconds"), "peak_rss": "per stage" if self.stage_peaks else "process so far", "stages": stages,
+            "total_wall": round(sum(record["wall"] for record in self.stages.values()), 4)}
+        profile_json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        return profile_json
+
+stage_timer = None                                                                          # The StageTimer collecting right now, if any
+
+def lap(name, **counts):                                                                    # import_oot() calls this at the end of each stage
+    if stage_timer is not None:
+        stage_timer.lap(name, **counts)
+
+def tally(**counts):                                                                        # ...and this to count work mid-stage
+    if stage_timer is not None:
+        stage_timer.tally(**counts)
+
+def profiled_import(this_oot_dir, asset_UID, import_ds, ds_workers=1, compact=False, incremental=False, overlap=True, stream=False, profile_stages=(), show=True): # import_oot() with a StageTimer running; prints the table (if show) and writes the JSON next to the workbook
+    global stage_timer
+    stage_timer = timer = StageTimer(profile_stages)                                        # Start the clock
+    try:
+        final_xlsx = import_oot(this_oot_dir, asset_UID, import_ds, ds_workers, compact, incremental, overlap, stream)
+    finally:
+        stage_timer = None                                                                  # Stop it, even if the import blew up
+    profile_json = timer.write(final_xlsx)
+    if show:
+        print(timer.table())
+        print(f"Profile written to {profile_json.name}")
+    return final_xlsx
+
+# TEMPLATE CACHE ############################################################################ NOTE load_workbook() on FSMOOTSIA.xlsm is the single biggest fixed cost of a run, so we only ever do it once per template version
+def register_workbook_pickling():                                                           # Teach pickle the three openpyxl containers it gets wrong; called before we freeze a workbook
+    from openpyxl.worksheet.table import TableList
+    from openpyxl.worksheet.dimensions import DimensionHolder
+    from openpyxl.utils.indexed_list import IndexedList
+    copyreg.pickle(TableList, lambda tables: (TableList, (), None, None, iter(dict.items(tables)))) # TableList.items() hands back (name, ref) strings instead of the tables, which is what pickle would use - so we give it the real ones
+    copyreg.pickle(IndexedList, lambda items: (IndexedList, (list(items),)))                # IndexedList de-dupes against a class-level dict while unpickling, which scrambles the style indexes - so rebuild it from a plain list instead
+    copyreg.pickle(DimensionHolder, lambda dims: (DimensionHolder, (dims.worksheet, dims.reference, dims.default_factory), dims.__dict__, None, iter(dict.items(dims)))) # defaultdict's own pickling forgets the factory, so new rows/columns would KeyError instead of appearing
+
+_template_snapshots = {}                                                                    # In-memory snapshots, cache key: pickled workbook. Batch workers inherit this from the parent, so they skip the disk too
+
+def template_cache_key(template):                                                           # Cache key: content hash + mtime + openpyxl version, so a new template OR a new openpyxl rebuilds the cache
+    import openpyxl
+    digest = hashlib.sha256(template.read_bytes()).hexdigest()[:16]                         # Hash the template itself; a few ms for a file this size
+    return f"{template.stem}-{digest}-{template.stat().st_mtime_ns}-{openpyxl.__version__}" # e.g. FSMOOTSIA-3f2a...-1724300000000000000-3.1.5
+
+def template_snapshot(template, rebuild=False):                                             # Get the pickled template workbook, building (and caching) it if we've never seen this version before; rebuild=True skips both caches
+    from openpyxl import load_workbook
+    key = template_cache_key(template)                                                      # Which version of the template is this?
+    snapshot = None if rebuild else _template_snapshots.get(key)                            # Already have it in memory?
+    if snapshot is not None:                                                                # Then we're done
+        return snapshot
+    cache_file = template_cache_dir / f"{key}.pickle.z"                                     # Where it'd live on disk
+    try:                                                                                    # A corrupt or half-written cache file shouldn't stop a run,
+        if rebuild:                                                                         # (a snapshot that wouldn't unpickle counts as junk)
+            raise OSError
+        snapshot = zlib.decompress(cache_file.read_bytes())                                 # so try to read it back,
+    except (OSError, zlib.error):                                                           # and if it's not there (or it's junk),
+        wb = load_workbook(template, data_only=False, keep_vba=False)                       # do the slow load one last time
+        register_workbook_pickling()
+        snapshot = pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)                       # and freeze it
+        try:                                                                                # The code dir may be on a read-only share, in which case we just stay in-memory
+            template_cache_dir.mkdir(parents=True, exist_ok=True)                           # Make sure the cache dir is there
+            for stale in template_cache_dir.glob(f"{template.stem}-*.pickle.z"):            # Any older versions of this template
+                stale.unlink()                                                              # are dead weight now
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")                        # Write to a temp file first (our own: two runs off a shared code folder may both be building it),
+            tmp_file.write_bytes(zlib.compress(snapshot, 1))                                # (level 1: ~10x smaller, and decompresses in a blink)
+            os.replace(tmp_file, cache_file)                                                # then swap it in, so parallel workers never read half a file
+        except OSError:                                                                     # Couldn't write it?
+            pass                                                                            # No big deal, the in-memory copy still works for this process
+    _template_snapshots[key] = snapshot                                                     # Remember it for the next run in this process
+    return snapshot
+
+def load_template(template=oot_template):                                                   # Drop-in replacement for load_workbook(oot_template, ...), served from the snapshot cache
+    snapshot = template_snapshot(template)                                                  # Pickled workbook for the current template
+    gc.disable()                                                                            # Unpickling creates ~100k cell objects; the cyclic GC firing every few hundred of those is most of the cost
+    try:
+        try:
+            return pickle.loads(snapshot)                                                   # A fresh, independent copy every call - runs never share cells
+        except (pickle.UnpicklingError, EOFError):                                          # Decompressed fine but won't unpickle? Bad snapshot, not a bad run:
+            return pickle.loads(template_snapshot(template, rebuild=True))                  # load the template for real and re-cache it
+    finally:
+        gc.enable()                                                                         # And back to normal
+
+# INCREMENTAL RE-IMPORT ##################################################################### NOTE A corrected datasheet or a few more trace rows used to mean a fresh workbook, and the tech re-keying everything they'd entered. --incremental patches the last output instead
+user_columns = ["M", "N", "O", "P", "R", "S", "T", "Y", "Z", "AI", "AJ"]                    # What the techs fill in by hand: test point, limits, spec type, DUT as found/ucty, final eval, notes
+test_point_columns = ["M", "N", "O", "P"]                                                   # Row 10 of these is the sheet's test point, not the asset's; rows below just point at it
+manifest_version = 2                                                                        # Bump this whenever the manifest (or what a patch assumes about the workbook) changes
+
+def manifest_file(final_xlsx):                                                              # OOT_{UID}.manifest.json, next to the workbook it describes
+    return final_xlsx.with_suffix(".manifest.json")
+
+def file_digest(path):                                                                      # SHA-256 of a file's contents
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def input_digests(this_oot_dir, import_ds):                                                 # {file name: SHA-256 of its contents, or None if it's not there (or not being imported)} for the rev trace and the datasheet
+    digests = {}
+    for name in (rev_trace, ds_filename) if import_ds else (rev_trace,):
+        try:
+            digests[name] = file_digest(this_oot_dir / name)
+        except FileNotFoundError:
+            digests[name] = None
+    return digests
+
+def read_manifest(final_xlsx):                                                              # The last run's manifest, or None if there isn't a usable one
+    try:
+        manifest = json.loads(manifest_file(final_xlsx).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == manifest_version else None
+
+def holds_entries(final_xlsx, manifest):                                                    # Might the workbook hold the techs' entries? Yes if anybody's saved over it since we wrote it, or if we wrote it keeping theirs (a patch, or a carry). No manifest to tell us: assume it does
+    return manifest is None or manifest["entries"] or not final_xlsx.exists() or file_digest(final_xlsx) != manifest.get("output")
+
+def row_keys(table_data):                                                                   # [DUT ID, content hash] per analysis row, in sheet order: the ID says whose entries a row holds, the hash says if the row itself changed
+    return [[None if row[0] is None else str(row[0]), hashlib.sha1(repr(row).encode()).hexdigest()[:16]] for row in table_data]
+
+def write_manifest(final_xlsx, inputs, keys, parameters, defaults, import_ds, compact, entries): # What the next --incremental run diffs against. entries: the workbook carries the techs' work, so a rebuild has to carry it again
+    manifest = {"version": manifest_version, "template": file_digest(oot_template), "import_ds": import_ds, "compact": compact, "entries": entries,
+        "inputs": inputs, "output": file_digest(final_xlsx), "rows": keys, "parameters": parameters, "defaults": defaults}
+    manifest_file(final_xlsx).write_text(json.dumps(manifest, default=str) + "\n", encoding="utf-8")
+
+def last_asset_row(keys):                                                                   # Sheet row of the last asset with a DUT ID (blanks all sort to the end), same as import_oot()'s last_row_in_range
+    return start_row + max(sum(1 for dut_id, _ in keys if dut_id is not None) - 1, 0)
+
+def user_entries(ws, first_row, last_row):                                                  # {DUT ID: [(row, {column: value})]} for the hand-entered cells of these rows, so they can follow their asset to its new row
+    from openpyxl.utils import column_index_from_string
+    cells = ws._cells
+    entries = {}
+    for row in range(first_row, last_row + 1):
+        dut_id = cells.get((row, 1))
+        if dut_id is None or dut_id.value is None:                                          # No asset, nothing to carry
+            continue
+        values = {}
+        for col in user_columns:
+            if row == start_row and col in test_point_columns:                              # The sheet's test point stays where it is
+                continue
+            cell = cells.get((row, column_index_from_string(col)))
+            values[col] = cell.value if cell is not None else None
+        entries.setdefault(str(dut_id.value), []).append((row, values))                     # (a list, since a trace can list the same DUT twice)
+    return entries
+
+def restore_user_entries(ws, row, entry, defaults, last_row_in_range):                      # Put one asset's hand-entered cells on this row, or the template's defaults if it doesn't have any yet
+    from openpyxl.utils import column_index_from_string
+    from openpyxl.formula.translate import Translator
+    origin, values = entry or (start_row, {})
+    for col in user_columns:
+        if row == start_row and col in test_point_columns:                                  # Row 10's test point belongs to the sheet
+            continue
+        if col in values:                                                                   # The asset's own entry,
+            value, source = values[col], origin
+        elif col in test_point_columns:                                                     # or the pointer at row 10's test point that import_oot() writes,
+            value, source = f'=IF(${col}${start_row}="","",${col}${start_row})' if row <= last_row_in_range else None, row
+        else:                                                                               # or whatever the template has there
+            value, source = defaults.get(col), start_row
+        if isinstance(value, str) and value.startswith("=") and source != row:              # Formulas (the template's Z and AI, mostly) follow the row
+            default = defaults.get(col)
+            if isinstance(default, str) and value == move_formula(default, f"{col}{start_row}", f"{col}{source}"): # Still the template's? Then move the template's, which we've already parsed
+                value = move_formula(default, f"{col}{start_row}", f"{col}{row}")
+            else:                                                                           # A tech's own formula; one of a kind, so not worth caching
+                value = Translator(value, origin=f"{col}{source}").translate_formula(f"{col}{row}")
+        if value is not None or (row, column_index_from_string(col)) in ws._cells:          # (no point making empty cells)
+            ws[f"{col}{row}"].value = value
+
+def carry_user_entries(old_wb, new_sheets, keys, defaults):                                 # Full rebuild under --incremental: copy every asset's hand-entered cells across from the last output, by DUT ID
+    last_row_in_range = last_asset_row(keys)
+    for ws in new_sheets:
+        title = ws.title if ws.title in old_wb.sheetnames else "Impact Analysis"            # Same sheet, or the plain analysis if the last run didn't have parameter sheets
+        if title not in old_wb.sheetnames:
+            continue
+        old_ws = old_wb[title]
+        for col in test_point_columns:                                                      # The sheet's test point
+            ws[f"{col}{start_row}"].value = old_ws[f"{col}{start_row}"].value
+        entries = user_entries(old_ws, start_row, old_ws.max_row)
+        for i, (dut_id, _) in enumerate(keys):
+            if entries.get(dut_id):                                                         # Only assets that had entries; the rest stay fresh
+                restore_user_entries(ws, start_row + i, entries[dut_id].pop(0), defaults, last_row_in_range)
+
+def patch_analysis_rows(ws, old_keys, keys, table_data, represents, defaults):              # Bring an analysis sheet from old_keys' rows to keys' rows, rewriting only from the first row that changed. Returns how many rows it rewrote
+    from openpyxl.utils import column_index_from_string
+    from openpyxl.worksheet.cell_range import MultiCellRange
+    first = next((i for i, (old, new) in enumerate(zip(old_keys, keys)) if old != new), min(len(old_keys), len(keys))) # First row that isn't the same asset with the same data
+    if first == len(old_keys) == len(keys):                                                 # Same rows, same order
+        return 0
+    old_end = start_row + max(len(old_keys), 1) - 1
+    end_row = start_row + max(len(keys), 1) - 1
+    entries = user_entries(ws, start_row + first, old_end)                                  # Everything hand-entered from there down, before we move anything
+    old_last, last_row_in_range = last_asset_row(old_keys), last_asset_row(keys)
+    if end_row != old_end:                                                                  # More or fewer rows than last time
+        size_analysis_sheet(ws, end_row, old_end)
+    for dv in ws.data_validations.dataValidation:                                           # Our Final Eval drop down (not the template's, which doesn't allow blanks) only covers rows with assets
+        if dv.allow_blank and dv.sqref.ranges and str(dv.sqref) in (f"AI{start_row}:AI{old_last}", f"AI{start_row}:AI{end_row}"):
+            dv.sqref = MultiCellRange(f"AI{start_row}:AI{last_row_in_range}")
+    dst_columns = [column_index_from_string(dst) for _, dst in rt_col_map]
+    group_size = column_index_from_string(group_size_column)
+    for i in range(first, len(keys)):                                                       # Every row from the first change down
+        row = start_row + i
+        for col, value in chain(zip(dst_columns, table_data[i]), [(group_size, represents[i] or None)]): # The asset's trace data, and how many it stands for
+            if value is not None or (row, col) in ws._cells:
+                ws.cell(row=row, column=col).value = value
+        ws.row_dimensions[row].hidden = not represents[i]                                   # Hidden if it's sampled out (or blank)
+        ws.cell(row=row, column=3).number_format = 'MM/DD/YYYY'                             # Column C still refuses to stay Date-formatted
+        dut_id = keys[i][0]
+        entry = entries[dut_id].pop(0) if entries.get(dut_id) else None                     # Its old entries, wherever they were
+        restore_user_entries(ws, row, entry, defaults, last_row_in_range)
+    return len(keys) - first
+
+def patch_oot(this_oot_dir, asset_UID, import_ds, ds_workers=1, compact=False):             # Patch the last OOT_{UID}.xlsx to match the current inputs. Returns its path, or None if it has to be rebuilt from the template
+    from openpyxl import load_workbook
+    final_xlsx = this_oot_dir / f"OOT_{asset_UID}.xlsx"
+    manifest = read_manifest(final_xlsx)
+    if (manifest is None or not final_xlsx.exists() or manifest["template"] != file_digest(oot_template)
+        or manifest["import_ds"] != import_ds or manifest["compact"] != compact):           # Nothing to diff against, or different options/template: that's a different workbook
+        return None
+    inputs = input_digests(this_oot_dir, import_ds)
+    old_inputs = manifest["inputs"]
+    if inputs == old_inputs:                                                                # Nothing's changed at all
+        print(f"{final_xlsx.name} is up to date.")
+        return final_xlsx
+    if not holds_entries(final_xlsx, manifest):                                             # A fresh build nobody's worked in yet, so there's nothing to keep,
+        return None                                                                         # and the template snapshot loads a lot faster than the workbook would
+    old_parameters = dict(manifest["parameters"])                                           # {parameter: sheet title}
+    parameters = list(old_parameters)
+    datasheet = None
+    ds_changed = inputs.get(ds_filename) != old_inputs.get(ds_filename)
+    if ds_changed:                                                                          # New, corrected or deleted datasheet
+        datasheet = load_datasheet(this_oot_dir / ds_filename, ds_workers) if inputs[ds_filename] else None
+        parameters = find_oot_parameters(datasheet["parameters"], datasheet["failures"]) if datasheet is not None else []
+        if bool(parameters) != bool(old_parameters):                                        # Going between the plain analysis and parameter sheets is a different workbook
+            return None
+    oot_wb = load_workbook(final_xlsx)                                                      # The last output is our starting point, instead of the template
+    analysis_sheets = [oot_wb[title] for title in old_parameters.values() if title in oot_wb.sheetnames] or [
+        oot_wb[title] for title in ["Impact Analysis"] if title in oot_wb.sheetnames]
+    if len(analysis_sheets) != max(len(old_parameters), 1):                                 # Somebody renamed or deleted a sheet; don't guess
+        oot_wb.close()
+        return None
+    lap("template")
+    keys, rows_patched, rt_columns = manifest["rows"], 0, None
+    if inputs[rev_trace] != old_inputs[rev_trace]:                                          # New or corrected trace
+        rt_columns = read_reverse_trace(this_oot_dir / rev_trace)
+        lap("read", rows=len(rt_columns[0]) - 1 if rt_columns else 0)
+        oot_rt = oot_wb["Reverse Trace"]
+        rt_rows = list(zip(*rt_columns))
+        for key in [key for key in oot_rt._cells if key[0] > len(rt_rows)]:                 # Rows past the new trace's end go entirely,
+            del oot_rt._cells[key]
+        width = oot_rt.max_column
+        for r, row in enumerate(rt_rows, start=1):                                          # and the rest get overwritten in place
+            for c in range(1, max(width, len(row)) + 1):
+                value = row[c - 1] if c <= len(row) else None
+                if value is not None or (r, c) in oot_rt._cells:
+                    oot_rt.cell(row=r, column=c).value = value
+        lap("copy", rows=len(rt_rows))
+        table_data = list(zip(*(rt_column(rt_columns, src) for src, _ in rt_col_map)))      # Same sampling as import_oot()
+        order, represents = sample_products(table_data)
+        table_data = [table_data[i] for i in order]
+        new_keys = row_keys(table_data)
+        for ws in analysis_sheets:
+            for coordinate, value in (("D1", rt_cell(rt_columns, "D2")), ("D2", rt_cell(rt_columns, "F2")), ("D3", rt_cell(rt_columns, "G2")), ("D4", rt_cell(rt_columns, "H2")), ("H1", len(table_data))):
+                ws[coordinate] = value                                                      # The header block
+            rows_patched = patch_analysis_rows(ws, keys, new_keys, table_data, represents, manifest["defaults"])
+        keys = new_keys
+        lap("sort", rows=rows_patched)
+    if ds_changed:
+        if "Datasheet" in oot_wb.sheetnames:                                                # The old Datasheet tab goes either way
+            oot_wb.remove(oot_wb["Datasheet"])
+        if datasheet is not None:
+            write_datasheet_tab(oot_wb, datasheet["rows"])
+        lap("pdf", rows=len(datasheet["rows"]) if datasheet is not None else 0)
+        sheets = {}                                                                         # {parameter: sheet}, in the datasheet's order
+        for param in parameters:
+            if param in old_parameters:                                                     # Still failing: keep the sheet and everything on it
+                sheets[param] = oot_wb[old_parameters[param]]
+            else:                                                                           # Newly failing: a copy of one we already have (rows are current now), wiped back to the defaults
+                sheets[param] = ws = stamp_sheet(analysis_sheets[0], param, analysis_sheets[0])
+                ws.freeze_panes = "B10"
+                for col in test_point_columns:
+                    ws[f"{col}{start_row}"].value = ""
+                for i in range(len(keys)):
+                    restore_user_entries(ws, start_row + i, None, manifest["defaults"], last_asset_row(keys))
+            write_worst_error(sheets[param], param, datasheet["worst"])                     # The worst failure may have moved either way
+        for param, title in old_parameters.items():                                         # Passing now: its sheet goes
+            if param not in sheets:
+                oot_wb.remove(oot_wb[title])
+        oot_wb._sheets = [ws for ws in oot_wb._sheets if ws not in sheets.values()] + list(sheets.values()) # Parameter sheets last, in datasheet order
+        lap("sheets", sheets=len(set(parameters) - set(old_parameters)))
+        parameters = [[param, ws.title] for param, ws in sheets.items()]
+    else:
+        parameters = manifest["parameters"]
+    if compact:                                                                             # Reading it back expanded the shared formulas, so share them again
+        for ws in oot_wb.worksheets:
+            share_formulas(ws)
+    oot_wb.save(final_xlsx)
+    lap("save")
+    write_manifest(final_xlsx, inputs, keys, parameters, manifest["defaults"], import_ds, compact, True) # (patched means their entries are in it)
+    index_oot(this_oot_dir, asset_UID, final_xlsx, rt_columns, (datasheet["worst"] if datasheet is not None else {}) if ds_changed else None) # Whatever changed, changes in the index too
+    print(output_report(final_xlsx, oot_wb) + f" (patched: {rows_patched} rows)")
+    oot_wb.close()
+    return final_xlsx
+
+# CONCURRENT INPUTS ######################################################################### NOTE The template, the rev trace and the datasheet don't need each other until the workbook gets assembled, so the two files load in worker processes while the template unpickles here
+def spare_cores(workers):                                                                   # Can every one of workers concurrent imports have a core for its input workers (start_inputs()) on top of its own?
+    return workers * 2 <= (os.cpu_count() or 1)
+
+def input_job(name, timed, func, *args):                                                    # Worker: func(*args), plus the stage's own timing and counts when the parent has a StageTimer running
+    global stage_timer
+    stage_timer = StageTimer() if timed else None                                           # (a forked worker would otherwise inherit the parent's timer, and count into a copy nobody reads)
+    if stage_timer is not None:
+        stage_timer.start(name)
+    result = func(*args)
+    if stage_timer is None:
+        return result, None
+    stage_timer.lap(name)                                                                   # Book it, and send the record home with the result
+    return result, stage_timer.stages[name]
+
+def start_inputs(rev_trace_file, ds_file=None, ds_workers=1):                               # Start reading the rev trace (if given) and parsing the datasheet (if given) in worker processes. Returns {stage: future}; empty if there's no pool to be had
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    timed = stage_timer is not None
+    jobs = {}
+    if rev_trace_file is None and ds_file is None:
+        return jobs
+    try:                                                                                    # Same deal as iter_ds_tables(): no pool, no problem, we just do it all here
+        pool = ProcessPoolExecutor(max_workers=(rev_trace_file is not None) + (ds_file is not None))
+        if rev_trace_file is not None:                                                      # (--stream reads it here, as it spools)
+            jobs["read"] = pool.submit(input_job, "read", timed, read_trace, rev_trace_file)
+        if ds_file is not None:
+            jobs["pdf"] = pool.submit(input_job, "pdf", timed, extract_datasheet, ds_file, ds_workers, ds_extractor)
+        pool.shutdown(wait=False)                                                           # No more jobs coming; the workers exit once theirs are done
+    except (OSError, BrokenProcessPool) as err:
+        print(f"Concurrent input loading failed ({err}), loading inputs one at a time.")
+        return {}
+    return jobs
+
+def join_input(job, func, *args):                                                           # A stage's result: from its worker if start_inputs() gave it one, otherwise (or if the worker died) func(*args), right here
+    from concurrent.futures.process import BrokenProcessPool
+    if job is not None:
+        try:
+            result, record = job.result()                                                   # Exceptions from func (bad trace, etc.) come through here like they would inline
+        except BrokenProcessPool as err:
+            print(f"Concurrent input loading failed ({err}), loading it here instead.")
+        else:
+            if record is not None and stage_timer is not None:
+                stage_timer.absorb(record)
+            return result
+    return func(*args)
+
+# PIPELINE STAGES ########################################################################### NOTE import_oot() is these stages run back to back; a GUI or service can run them one at a time instead, keep the results between clicks, and only render a workbook when it needs one
+class Trace:                                                                                # A read Reverse Trace: its columns (one tuple per column, header row included; None for any column --stream didn't keep) and the header block's values
+    __slots__ = ("columns", "oot_uid", "owning_lab", "prev_cal", "curr_cal", "assets")
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.oot_uid, self.owning_lab, self.prev_cal, self.curr_cal = (rt_cell(columns, coordinate) for coordinate in ("D2", "F2", "G2", "H2")) # (None on a header-only trace)
+        self.assets = len(columns[0]) - 1 if columns else 0                                 # Every row but the header
+
+class Sample:                                                                               # The sampled analysis: one tuple of rt_col_map columns per asset, in sheet order, and how many assets each row stands for (see sample_products())
+    __slots__ = ("rows", "represents", "last_row_in_range", "end_row")
+
+    def __init__(self, rows, represents):
+        self.rows, self.represents = rows, represents
+        self.last_row_in_range = start_row + max(sum(1 for count in represents if count is not None) - 1, 0) # Sheet row of the last asset with a DUT ID - blanks all sort to the end
+        self.end_row = start_row + max(len(rows), 1) - 1                                    # The analysis is exactly as long as the trace - no more 5k-row ceiling, no more 5k rows for a 40-asset trace
+
+class Datasheet:                                                                            # A parsed datasheet: the filtered rows, the parameter model ([name, first row, last row]), failed rows and the worst failure per parameter
+    __slots__ = ("rows", "parameters", "failures", "worst")
+
+    def __init__(self, rows, parameters, failures, worst):                                  # (same fields as load_datasheet()'s dict, so Datasheet(**parsed) works)
+        self.rows, self.parameters, self.failures, self.worst = rows, parameters, failures, worst
+
+def read_trace(rev_trace_file):                                                             # Stage: the Reverse Trace, as a Trace
+    return Trace(read_reverse_trace(rev_trace_file))
+
+def sample_trace(trace):                                                                    # Stage: one representative asset per product, as a Sample
+    table_data = list(zip(*(rt_column(trace.columns, src) for src, _ in rt_col_map)))       # One tuple per asset, holding just the mapped columns, in rt_col_map order
+    order, represents = sample_products(table_data)                                         # One hash pass: which assets share a product, and which one stands in for each product
+    return Sample([table_data[i] for i in order], represents)                               # Reorder the assets: grouped by product, representative first
+
+def extract_datasheet(ds_file, workers=1, extractor=None):                                  # Stage: the datasheet (from the cache when we can), as a Datasheet, or None if it has no test results
+    parsed = load_datasheet(ds_file, workers, extractor)
+    return Datasheet(**parsed) if parsed is not None else None
+
+def map_failures(datasheet):                                                                # Stage: the parameters with at least one failed test point, in datasheet order; each gets its own analysis sheet
+    return find_oot_parameters(datasheet.parameters, datasheet.failures) if datasheet is not None else []
+
+def render_analysis(oot_wb, trace, sample, stream=False):                                   # Stage: fill the template's Reverse Trace and Impact Analysis tabs from a Trace and its Sample (with --stream, just the header block and pattern rows)
+    from openpyxl.utils import column_index_from_string
     oot_rt = oot_wb["Reverse Trace"]                                                        # FSMOOTSIA.xlsm > Reverse Trace (tab); receives FSM's rev trace data
     oot_ia = oot_wb["Impact Analysis"]                                                      # FSMOOTSIA.xlsm > Impact Analysis (tab); where we're doing the dirty work.
-    rt_wb = load_workbook(rev_trace_file)                                                   # Load the FSM-supplied Reverse Trace Workbook
-    rt_ws = rt_wb["Reverse Trace - UID"]                                                    # Load the correct sheet from the rt_wb, so we can get at the data
     # HEADER DATA ###########################################################################
-    oot_uid =  rt_ws['D2'].value                                                            # Get the Asset's UID
-    oot_ia['D1'] = oot_uid                                                                  # Assign it to the header of the template
-    owning_lab = rt_ws['F2'].value                                                          # Get the owning lab
-    oot_ia['D2'] = owning_lab                                                               # Assign it to the header of the template
-    prev_cal = rt_ws['G2'].value                                                            # HACK Get the previous calibration date
-    oot_ia['D3'] = prev_cal                                                                 # Assign it to the header of the template
-    curr_cal = rt_ws['H2'].value                                                            # HACK Get the current calibration date, completing the date range for the cal cycle
-    oot_ia['D4'] = curr_cal                                                                 # Assign it to the header of the template
-    analysis_date = today                                                                   # When was the analysis performed? Today, duh.
-    oot_ia['D5'] = analysis_date                                                            # Assign it to the header of the template
-    last_row = rt_ws.max_row - 1                                                            # Get how many assets there are
-    oot_ia['H1'] = last_row                                                                 # Assign it to the header of the template
+    oot_ia['D1'] = trace.oot_uid                                                            # The Asset's UID (D2), into the header of the template
+    oot_ia['D2'] = trace.owning_lab                                                         # The owning lab (F2)
+    oot_ia['D3'] = trace.prev_cal                                                           # HACK The previous calibration date (G2)
+    oot_ia['D4'] = trace.curr_cal                                                           # HACK The current calibration date (H2), completing the date range for the cal cycle
+    oot_ia['D5'] = datetime.today().strftime('%m/%d/%Y')                                    # When was the analysis performed? Today, duh.
+    oot_ia['H1'] = trace.assets                                                             # How many assets there are
     # COPY RAW REVERSE TRACE DATA INTO TEMPLATE WB ##########################################
-    for row in rt_ws.iter_rows():                                                           # Each row in rev trace raw data
-        for cell in row:                                                                    # Each cell in that data
-            new_cell = oot_rt.cell(row=cell.row, column=cell.column, value=cell.value)      # Copy it into the template's Reverse Trace tab
-    rt_wb.close()                                                                           # Close the Reverse Trace workbook, we no longer need it as we got the data we came for already
-    # TAKE RECENTLY IMPORTED DATA AND MOVE IT TO ANALYSIS LOCATION ##########################
-    col_map = [
-        ('J', 'A'), ('K', 'B'), ('L', 'C'),
-        ('O', 'D'), ('Q', 'F'), ('R', 'G'),
-        ('S', 'I'), ('M', 'J'), ('N', 'K'),
-        ('P', 'L')]                                                                         # Map the columns to each other
-    for src, dst in col_map:                                                                # Iterate over the mapped pairs
-        values = [oot_rt[f"{src}{row}"].value for row in range(2, last_row + 2)]            # Get the data in the filled in the source range
-        for i, value in enumerate(values, start=10):                                        # Get the spaces in destination range
-            oot_ia[f"{dst}{i}"].value = value                                               # Dump the source data into the destination ranges
-    # SAMPLE METHOD INIT  ###################################################################
-    col = 'A'                                                                               # We should examine Col A for blanks, so we can hide them
-    last_row_in_range = start_row                                                           # Start from the beginning at "Analysis Row 0"
-    sort_column = 2                                                                         # Column B, in number-count, so we can check Products, as our sample-method relies on unique 'products' which mfgr/model pairs
-    for row in range(start_row, end_row + 1):                                               # Get the actual range of the sheet, as well as hides empty-product fields
-        if oot_ia[f"{col}{row}"].value is not None:                                         # Check each cell in Col A for blanks
-            last_row_in_range = row                                                         # if not blank, we set the new last row, and continue the loop. At the end, we find the true last row.
-        else:                                                                               # if blank, however, we've found the end and the latest last_row_in_range continues the very last asset's row
-            oot_ia.row_dimensions[row].hidden = True                                        # we can just hide this row now, and continue the loop, instead of iterating over the last_row_in_range to end_row (5008) in a second loop.
-    # EXTRACT ALL ROWS OF DATA FOR SORT #####################################################
-    table_data = []                                                                         # Establish a clean data object
-    for row in range(start_row, last_row_in_range + 1):                                     # Iterate over the actual range of the data
-        row_data = [oot_ia.cell(row=row, column=col).value for col in range(1, 13)]         # Constrain the column data to A-M - prevents other issues later
-        table_data.append(row_data)                                                         # Stuff it into the Table object
-    table_data.sort(key=lambda x: x[sort_column - 1])                                       # Sort the rows in the data table based on Column B, adjusting for 0-based index
-    for idx, row_data in enumerate(table_data, start=start_row):                            # Iterate over the rows of table_data
-        for col_idx, value in enumerate(row_data, start=1):                                 # Grab each cell, so we can...
-            oot_ia.cell(row=idx, column=col_idx).value = value                              # ...distribute the sorted data back into the worksheet
-    # HIDE DUPLICATE PRODUCTS ############################################################### NOTE This is the actual sample occuring, every leading up to now has been prep for it
-    for product in range(start_row + 1, last_row_in_range + 1):                             # Iterate over each row to compare product values in column B
-        if oot_ia[f"B{product}"].value == oot_ia[f"B{product-1}"].value:                    # if this row's product matches the previous product, then...
-            oot_ia.row_dimensions[product].hidden = True                                    # ...hide the entire row
+    if not stream:                                                                          # (--stream writes them straight from the spool at save time)
+        write_rows(oot_rt, zip(*trace.columns))                                             # Rows back out of the columns, straight into the template's Reverse Trace tab
+    lap("copy", rows=trace.assets + 1)
+    # TAKE SAMPLED DATA AND MOVE IT TO ANALYSIS LOCATION ####################################
+    end_row, last_row_in_range = sample.end_row, sample.last_row_in_range
+    if stream:                                                                              # --stream: the asset rows get built as they're written (analysis_rows()), so the sheet just keeps its pattern rows
+        trim_to_patterns(oot_ia, end_row)
+        add_group_size_column(oot_ia, [], end_row)                                          # (header and table column only)
+    else:
+        size_analysis_sheet(oot_ia, end_row)                                                # Grow or trim the template to match
+        dst_columns = [column_index_from_string(dst) for _, dst in rt_col_map]              # Where each mapped column lands in the Impact Analysis
+        write_rows(oot_ia, sample.rows, first_row=start_row, columns=dst_columns)           # One pass to put the sampled assets into the analysis; the template's own formula columns (E, H, ...) stay put
+        add_group_size_column(oot_ia, sample.represents, end_row)                           # Show how many assets each visible row stands for
+        for i, count in enumerate(sample.represents):                                       # Each asset, in sheet order
+            if not count:                                                                   # A duplicate product (0), or no DUT ID at all (None)?
+                oot_ia.row_dimensions[start_row + i].hidden = True                          # ...hide the entire row
+    lap("sort", rows=len(sample.rows))
     # CLEAN UP FROM THE DATA IMPORT #########################################################
     oot_ia['M10'] = ""                                                                      # So. The form's first actual data row, row 11, needs to be blank. This is because most the sheet will refer to this data, and duplicate it. 
     oot_ia['N10'] = ""                                                                      # Why duplicate it, instead of listing it once and being done forever? That is because not all rows will ACTUALLY need those particular data
     oot_ia['O10'] = ""                                                                      # And those particular data are just the starting point for the analysis itself. 
     oot_ia['P10'] = ""                                                                      # So we're building the jumping off point, for this entire imapct analysis sheet
     oot_ia['C10'].number_format = 'MM/DD/YYYY'                                              # And column C, for some reason, simply refuses to stay Date-formatted.
-    for row in range(11, last_row_in_range + 1):                                            # And then, from there, we establish the referencing mentioned above, by iterating over Rows 12-last_row
-        oot_ia[f"C{row}"].number_format = 'MM/DD/YYYY'                                      # And FORCING DATE FORMAT
-        oot_ia[f'M{row}'] = '=IF($M$10="","",$M$10)'                                        # And then referencing the top-most row. This way, if we need to compare other test points (not uncommon)
-        oot_ia[f'N{row}'] = '=IF($N$10="","",$N$10)'                                        # We can just overwrite these data and input the new data
-        oot_ia[f'O{row}'] = '=IF($O$10="","",$O$10)'                                        # and get the same level of analysis and comparison to ensure our customers' equipment
-        oot_ia[f'P{row}'] = '=IF($P$10="","",$P$10)'                                        # was or was not affected by the OOT Condition of the errant standard
-        if oot_ia[f'A{row}'].value is None:                                                 # And finally, we double check that Column A's data isn't blank
-            oot_ia.row_dimensions[row].hidden = True                                        # Because if it is, we hide it.
-    # DATASHEET IMPORT ###################################################################### NOTE: Only works on Tek Datasheets
-    if ds_import in ["y", "yes"]:                                                           # Remember asking this in the last line of error checking?
-        ds_file = this_oot_dir / ds_filename                                                # Establish the datasheet file
-        if not ds_file.exists():                                                            # pretty clear: if it doesn't exist, then...
-            file = ds_file.name                                                             # establish just the file name
-            print(f"{file} does not exist.")                                                # report the problem and move on
-        else:                                                                               # But if it does exist
-            with pdfplumber.open(ds_file) as pdf:                                           # we crack that bad boy open with pdfplumber
-                all_table_data = []                                                         # Establish as clean data_table for this purpose
-                for page in pdf.pages:                                                      # Iterate over every page in the pdf
-                    table = page.extract_table()                                            # pdfplumber.extract_table() pulls the data and best guesses at an excel-like table format; it's pretty okay
-                    if table:                                                               # if that succeeds and grabs data,
-                        all_table_data.extend(table)                                        # then we pop this page's data into the formerly-clean table object established above
-                tableData = all_table_data                                                  # Duplicate the object, so we can interact with that
-            if tableData:                                                                   # Make sure that processed okay
-                # EXTRACT ONLY DATA BETWEEN KEYWORDS ########################################
-                start_keyword = "Function"                                                  # This is keyword 1, found immediately prior to the relevant data
-                end_keyword = "Decision Rule"                                               # This is keyword 2, found immediately after the relevant data
-                filtered_table = []                                                         # yet another clean tablwe object
-                recording = False                                                           # This is the flag to see if we're pulling that row of data
-                for row in tableData:                                                       # for each row of data:
-                    if row and any(start_keyword in str(cell) for cell in row if cell):     # see if it's after the start keyword
-                        recording = True                                                    # if it is, we're recording it
-                    if recording:                                                           # if we're recording it,
-                        filtered_table.append(row)                                          # we'll add it to our filtered dataset
-                    if row and any(end_keyword in str(cell) for cell in row if cell):       # see if it's after the end keyword
-                        break                                                               # and remove that
-                # REMOVE LAST ROW - EXTRANEOUS CATCH ########################################
-                if filtered_table and any(end_keyword in str(cell) for cell in filtered_table[-1] if cell): # containing "Decision Rule"
-                    filtered_table.pop()                                                    # kick that mother- outta there
-                # REGENERARTE THE DATASHEET IN EXCEL ########################################
-                if "Datasheet" in oot_wb.sheetnames:                                        # This is just a clean up subroutine
-                    ws_old = oot_wb["Datasheet"]                                            # find any old Datasheet tab
-                    oot_wb.remove(ws_old)                                                   # kill it
-                oot_ds = oot_wb.create_sheet("Datasheet", index=0)                          # Then we're going to add a new one
-                for row in filtered_table:                                                  # And for each row in the filtered DS data
-                    oot_ds.append(row)                                                      # Dump it into the Datasheet tab in Excel
-            else:                                                                           # if we couldn't find the table data after pulling it out of the pdf
-                print("Could not extract data.")                                            # then we report the issue and move on
-    # DUPLICATE IMPACT ANALYSIS TAB FOR EACH OOT PARAMETER ##################################
-    parameter_list = {}                                                                     # Start with a clean parameter list
-    for idx, row in enumerate(oot_ds.iter_rows(min_row=1, values_only=True), start=1):      # iterate over the rows in the ds tab 
-        col_a = row[0]                                                                      # establish Col A in this paradigm
-        col_b = row[1] if len(row) > 1 else None                                            # establish Col B (or None) - and this is our checker for a "parameter" row
-        if col_a and not col_b:                                                             # IF Column A has text AND Column B is empty
-            parameter_list[str(col_a)] = idx                                                # key = Column A text, value = row number; now we have a list of the grey parameter bars from the Tek DS
-    # FIND FAILURES IN COL D ################################################################
-    failures = []                                                                           # Clean failures list
-    for idx, row in enumerate(oot_ds.iter_rows(min_row=1, values_only=True), start=1):      # iterate over the DS tab's rows
-        col_d = row[3] if len(row) > 3 else None                                            # Column D is index 3
-        if col_d == "Fail":                                                                 # IF matches exactly "Fail", not "Fail*"
-            failures.append(idx)                                                            # THEN add it to the list
-    fail_formula = '=$D1="Fail"'                                                            # Establish a conditional formatting rule
-    oot_ds.conditional_formatting.add(f"D1:D{oot_ds.max_row}",FormulaRule(formula=[fail_formula],fill=red_fill)) # Add it the DS Tab, so we can quickly see failures throughout the DS
-    sorted_params = sorted(parameter_list.items(), key=lambda x: x[1])                      # Sort parameters by row number
-    param_ranges = {}                                                                       # Clean dict of param_name: (param_start_row, param_end_row)
-    for i, (param, param_start_row) in enumerate(sorted_params):                            # iterate over the sorted parameters
-        if i + 1 < len(sorted_params):                                                      # if next param is on row 90
-            param_end_row = sorted_params[i + 1][1] - 1                                     # then this param's last row is 89
-        else:                                                                               # OR
-            param_end_row = oot_ds.max_row                                                  # we've hit the end of the list, and that should be this param's last row #
-        param_ranges[param] = (param_start_row, param_end_row)                              # now build the dictioary of each parameters' ranges
-    # MATCH FAILURES TO PARAMETERS ########################################################## NOTE We're matching fails to parameters
-    oot_parameters = []                                                                     # Clean parameters list
-    for fail_row in failures:                                                               # for each failed test point
-        for param, (start, end) in param_ranges.items():                                    # iterate over the dictioary of params and their ranges
-            if start <= fail_row <= end:                                                    # if this fail between the start/end of X param
-                oot_parameters.append(param)                                                # add it to the list of oot parameters
-                break                                                                       # and then break out of this sub-loop, to move on to the failed test point
-    oot_parameters = list(dict.fromkeys(oot_parameters))                                    # And then we drop everything but the parameter names, for a single list of parameters that require analysis
-    # BUILD NEW ANALYSIS SHEETS PER FAILED PARAMETER ######################################## NOTE and those new sheets need conditional formatting!
+    if not stream:                                                                          # (--stream does these as it writes the rows)
+        for row in range(11, last_row_in_range + 1):                                        # And then, from there, we establish the referencing mentioned above, by iterating over Rows 12-last_row
+            oot_ia[f"C{row}"].number_format = 'MM/DD/YYYY'                                  # And FORCING DATE FORMAT
+            oot_ia[f'M{row}'] = '=IF($M$10="","",$M$10)'                                    # And then referencing the top-most row. This way, if we need to compare other test points (not uncommon)
+            oot_ia[f'N{row}'] = '=IF($N$10="","",$N$10)'                                    # We can just overwrite these data and input the new data
+            oot_ia[f'O{row}'] = '=IF($O$10="","",$O$10)'                                    # and get the same level of analysis and comparison to ensure our customers' equipment
+            oot_ia[f'P{row}'] = '=IF($P$10="","",$P$10)'                                    # was or was not affected by the OOT Condition of the errant standard
+    lap("formulas", rows=max(last_row_in_range - start_row, 0))
+
+def render_datasheet(oot_wb, datasheet):                                                    # Stage: the Datasheet tab, replacing any old one
+    if "Datasheet" in oot_wb.sheetnames:                                                    # This is just a clean up subroutine
+        oot_wb.remove(oot_wb["Datasheet"])                                                  # find any old Datasheet tab, and kill it
+    return write_datasheet_tab(oot_wb, datasheet.rows)                                      # Then we're going to add a new one
+
+def render_parameter_sheets(oot_wb, datasheet, parameters, sample, compact=False):          # Stage: one analysis sheet per failed parameter, stamped from the rendered Impact Analysis. Returns [[parameter, sheet title]]
+    from openpyxl.drawing.image import Image as XLImage
+    from openpyxl.worksheet.datavalidation import DataValidation
+    oot_ia = oot_wb["Impact Analysis"]
+    end_row, last_row_in_range = sample.end_row, sample.last_row_in_range
     target_ranges = [f"M{start_row}:P{end_row}", 
         f"R{start_row}:S{end_row}", 
         f"Y{start_row}:Z{end_row}"]                                                         # Establish our conditional formatting ranges
-    for param in oot_parameters:                                                            # Iterate over the list of failed parameters
-        new_sheet = oot_wb.copy_worksheet(oot_ia)                                           # Build that new sheet per parameter
-        new_sheet.title = param                                                             # Rename the sheet to the OOT parameter
+    if compact:                                                                             # Compact output? Share the per-row formulas now, so every parameter sheet stamps the shared version
+        for ws in oot_wb.worksheets:
+            share_formulas(ws)
+    first_sheet = None                                                                      # The first parameter sheet gets the real formatting; the rest share it
+    parameter_sheets = []                                                                   # [[parameter, sheet title]], for the manifest
+    for param in parameters:                                                                # Iterate over the list of failed parameters
+        new_sheet = stamp_sheet(oot_ia, param, first_sheet)                                 # Build that new sheet per parameter, named for the OOT parameter
         new_sheet.freeze_panes = "B10"                                                      # We always want to see the table headers and UID column
+        write_worst_error(new_sheet, param, datasheet.worst)                                # And the worst of this parameter's failures, up top
+        parameter_sheets.append([param, new_sheet.title])
+        if first_sheet is not None:                                                         # Formatting, validation and logo came along with the stamp
+            continue
         dv = DataValidation(type="list", formula1="=$AD$1:$AD$6", allow_blank=True)         # Establish the data validation 'rule'
         new_sheet.add_data_validation(dv)                                                   # make it exist in the worksheet
         dv.add(f"$AI$10:$AI${last_row_in_range}")                                           # and then attach it to the correct cells
@@ -254,12 +1490,607 @@ def main():
         if tek_logo.exists():                                                               # Check to see the logo file exists
             logo_img = XLImage(tek_logo)                                                    # Go ahead and grab that
             new_sheet.add_image(logo_img, "A1")                                             # And slap it into the new sheets
+        first_sheet = new_sheet
+    if parameter_sheets:                                                                    # If we built per-parameter sheets from it,
+        oot_wb.remove(oot_ia)                                                               # remove the extraneous template sheet; otherwise it IS the analysis, so it stays
+    return parameter_sheets
+
+def render_oot(trace, sample, datasheet=None, compact=False):                               # All the render stages on a fresh copy of the template, for callers that have every input in hand. Returns (workbook, [[parameter, sheet title]]); nothing gets saved
+    oot_wb = load_template(oot_template)
+    render_analysis(oot_wb, trace, sample)
+    if datasheet is not None:
+        render_datasheet(oot_wb, datasheet)
+    return oot_wb, render_parameter_sheets(oot_wb, datasheet, map_failures(datasheet), sample, compact)
+
+def save_output(oot_wb, final_xlsx, parameter_sheets, workers=1, identical=True):           # Save a rendered workbook: several parameter sheets write their shared asset rows once (save_shared()), otherwise a plain save. identical=False: the sheets' rows differ (entries carried in), so each writes its own
+    if len(parameter_sheets) > 1:                                                           # Several parameter sheets: their asset rows only get written once, and the sheets get deflated in parallel
+        save_shared(oot_wb, final_xlsx, [title for _, title in parameter_sheets] if identical else [], workers)
+    else:
+        oot_wb.save(final_xlsx)                                                             # Save the new file
+
+# IMPORT PIPELINE ###########################################################################
+def import_oot(this_oot_dir, asset_UID, import_ds, ds_workers=1, compact=False, incremental=False, overlap=True, stream=False): # The whole import for one asset folder. No prompts in here, so batch mode can run it headless. overlap: load the inputs (and deflate the parameter sheets) concurrently
+    from openpyxl import load_workbook
+    if stream and (compact or incremental):                                                 # Both of those work on the whole sheet in memory, which is exactly what --stream never has
+        raise ValueError("stream can't be combined with compact or incremental")
+    if incremental:                                                                         # Patch the last output if we can; otherwise rebuild, carrying the techs' entries across
+        final_xlsx = patch_oot(this_oot_dir, asset_UID, import_ds, ds_workers, compact)
+        if final_xlsx is not None:
+            return final_xlsx
+    rev_trace_file = this_oot_dir / rev_trace                                               # Establish the file we need
+    ds_file = this_oot_dir / ds_filename                                                    # And the one we might want
+    if overlap and spare_cores(1) and not (stage_timer is not None and {"read", "pdf"} & stage_timer.profile_stages): # (cProfile can't follow a stage into a worker, so profiling either one means running them here)
+        jobs = start_inputs(None if stream else rev_trace_file, ds_file if import_ds and ds_file.exists() else None, ds_workers) # The rev trace and datasheet get going while the template loads
+    else:
+        jobs = {}
+    # LOAD WORKBOOK, SHEETS ################################################################# HACK I just learned that opnepyxl plays nice with path objects, so I don't have to refactor most of this as I rebuild around pathlib. Very excited!! - AJH 21AUG25
+    oot_wb = load_template(oot_template)                                                    # Load the workbook (from the template cache), so we can get its sheets (read: tabs)
+    oot_rt = oot_wb["Reverse Trace"]                                                        # FSMOOTSIA.xlsm > Reverse Trace (tab); receives FSM's rev trace data
+    oot_ia = oot_wb["Impact Analysis"]                                                      # FSMOOTSIA.xlsm > Impact Analysis (tab); where we're doing the dirty work.
+    defaults = {col: oot_ia[f"{col}{start_row}"].value for col in user_columns}             # The template's own entries in the hand-entered columns, for the manifest
+    lap("template")
+    if stream:                                                                              # --stream: every row goes to a spool file for the Reverse Trace tab, and only the columns we use stay in memory
+        spool = tempfile.TemporaryFile()
+        trace = Trace(spool_reverse_trace(rev_trace_file, spool))
+    else:
+        trace = join_input(jobs.get("read"), read_trace, rev_trace_file)                    # Load the FSM-supplied Reverse Trace, once, into columns (or pick it up from its worker)
+    lap("read", rows=trace.assets)
+    sample = sample_trace(trace)                                                            # NOTE This is the actual sample occuring, every leading up to now has been prep for it
+    render_analysis(oot_wb, trace, sample, stream)                                          # Header block, the raw trace and the sampled rows into the template
+    # DATASHEET IMPORT ###################################################################### NOTE: Only works on Tek Datasheets
+    datasheet = None                                                                        # No Datasheet tab until we've actually got one
+    if import_ds:                                                                           # Remember asking this in the last line of error checking? (or the --datasheet flag, in batch mode)
+        if not ds_file.exists():                                                            # pretty clear: if it doesn't exist, then...
+            file = ds_file.name                                                             # establish just the file name
+            print(f"{file} does not exist.")                                                # report the problem and move on
+        else:                                                                               # But if it does exist
+            datasheet = join_input(jobs.get("pdf"), extract_datasheet, ds_file, ds_workers) # we crack that bad boy open with pdfplumber (or pull it straight from the cache), most likely already done by now
+            if datasheet is not None:                                                       # Make sure that processed okay
+                render_datasheet(oot_wb, datasheet)                                         # REGENERARTE THE DATASHEET IN EXCEL
+            else:                                                                           # if we couldn't find the table data after pulling it out of the pdf
+                print("Could not extract data.")                                            # then we report the issue and move on
+    lap("pdf", rows=len(datasheet.rows) if datasheet is not None else 0)
+    # BUILD NEW ANALYSIS SHEETS PER FAILED PARAMETER ######################################## NOTE and those new sheets need conditional formatting!
+    oot_parameters = map_failures(datasheet)                                                # No datasheet, no failed parameters, no extra sheets
+    parameter_sheets = render_parameter_sheets(oot_wb, datasheet, oot_parameters, sample, compact)
+    lap("sheets", sheets=len(oot_parameters))
     # FINAL CLEANUP #########################################################################
-    oot_wb.remove(oot_ia)                                                                   # remove the extraneous template sheet
     oot_out_file = f"OOT_{asset_UID}.xlsx"                                                  # Build the filename
     final_xlsx = this_oot_dir / oot_out_file                                                # Build the new filepath, as a path object
-    oot_wb.save(final_xlsx)                                                                 # Save the new file
+    keys = row_keys(sample.rows)                                                            # Which asset is on which row, for the manifest
+    carried = incremental and final_xlsx.exists() and holds_entries(final_xlsx, read_manifest(final_xlsx)) # Rebuilding over an output the techs have been working in (or one we've already patched/carried their work into)?
+    if carried:
+        old_wb = load_workbook(final_xlsx)
+        carry_user_entries(old_wb, [oot_wb[title] for _, title in parameter_sheets] or [oot_ia], keys, defaults) # Bring their entries along
+        old_wb.close()
+    cells = None
+    if stream:                                                                              # --stream: the rows come out of the spool and the pattern rows as the sheets get written
+        row_sources = {ws.title: (analysis_rows(ws, sample.rows, sample.represents, sample.last_row_in_range, sample.end_row), streamed_dimension(ws, sample.end_row))
+            for ws in [oot_wb[title] for _, title in parameter_sheets] or [oot_ia]}
+        row_sources[oot_rt.title] = (reverse_trace_rows(oot_rt, iter_spool(spool)), streamed_dimension(oot_rt, max(trace.assets + 1, oot_rt.max_row)))
+        cells = save_streamed(oot_wb, final_xlsx, row_sources) + sum(len(ws._cells) for ws in oot_wb.worksheets if ws.title not in row_sources)
+        spool.close()
+    else:
+        save_output(oot_wb, final_xlsx, parameter_sheets, (os.cpu_count() or 1) if overlap else 1, not carried) # Save the new file (each parameter sheet with its own entries, if any got carried in)
+    lap("save")
+    write_manifest(final_xlsx, input_digests(this_oot_dir, import_ds), keys, parameter_sheets, defaults, import_ds, compact, carried) # So the next --incremental run can patch this one
+    index_oot(this_oot_dir, asset_UID, final_xlsx, trace.columns, datasheet.worst if datasheet is not None else {}) # And into the asset index, for the cross-OOT questions
+    print(output_report(final_xlsx, oot_wb, cells))                                         # How big did it come out?
     oot_wb.close()                                                                          # Close the workbook entirely
+    return final_xlsx                                                                       # Hand back where it landed, so callers can report on it
+
+# BATCH MODE ################################################################################
+def find_oot_dirs(targets):                                                                 # Turn a list of folders/globs (or rev trace files) into a de-duplicated list of asset folders
+    oot_dirs = []                                                                           # Clean list of asset folders, in the order we were given them
+    for target in targets:                                                                  # Each thing on the command line
+        matches = sorted(glob.glob(target)) if glob.has_magic(target) else [target]         # Expand globs ourselves, since cmd.exe won't do it for the Windows folks
+        for match in matches:                                                               # Each folder (or file) the target stands for
+            path = Path(match).resolve()                                                    # Absolute paths, so the workers don't care where we ran from
+            if path.name == rev_trace:                                                      # Somebody pointed us right at the Reverse Trace itself,
+                path = path.parent                                                          # so the asset folder is the one holding it
+            if path not in oot_dirs:                                                        # Globs love to overlap, so skip anything we already have
+                oot_dirs.append(path)                                                       # Queue it up
+    return oot_dirs
+
+def batch_worker(this_oot_dir, import_ds, ds_workers=1, compact=False, incremental=False, overlap=False, stream=False, profile_stages=None): # Runs one asset inside the process pool, and NEVER raises, so one bad trace can't sink the batch
+    try:                                                                                    # Give it a shot
+        if not (this_oot_dir / rev_trace).exists():                                         # No rev trace, no analysis
+            return this_oot_dir, False, f"{rev_trace} does not exist."                      # Report it like the interactive mode would
+        if profile_stages is not None:                                                      # --profile: each asset gets its own JSON next to its workbook (no table; the workers would talk over each other)
+            final_xlsx = profiled_import(this_oot_dir, this_oot_dir.name, import_ds, ds_workers, compact, incremental, overlap, stream, profile_stages, show=False)
+        else:
+            final_xlsx = import_oot(this_oot_dir, this_oot_dir.name, import_ds, ds_workers, compact, incremental, overlap, stream) # Folder name is the UID, same as the interactive mode assumes
+        return this_oot_dir, True, final_xlsx.name                                          # Hand back the output file for the summary
+    except Exception as err:                                                                # Anything at all goes wrong in there,
+        return this_oot_dir, False, f"{type(err).__name__}: {err}"                          # we report it instead of dying
+
+def batch_main(targets, import_ds, workers=None, ds_workers=1, compact=False, incremental=False, overlap=True, stream=False, profile_stages=None): # Headless entry point: every asset folder in targets, in parallel, then a summary
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    oot_dirs = find_oot_dirs(targets)                                                       # Work out what we're actually processing
+    if not oot_dirs:                                                                        # Nothing matched?
+        print("No OOT directories found.")                                                  # Say so
+        return 1                                                                            # ...and bail with a failure code
+    workers = min(workers or os.cpu_count() or 1, len(oot_dirs))                            # One worker per core by default, but no more workers than assets
+    overlap = overlap and spare_cores(workers)                                              # Overlapping an asset's inputs only pays when there are cores the other assets aren't already using
+    template_snapshot(oot_template)                                                         # Warm the template cache once up front, instead of every worker racing to build it
+    results = {}                                                                            # this_oot_dir: (ok, message)
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_ds_extractor, initargs=(ds_extractor,)) as pool: # openpyxl is pure-python CPU time, so processes (not threads) are what actually parallelize it
+        futures = [pool.submit(batch_worker, d, import_ds, ds_workers, compact, incremental, overlap, stream, profile_stages) for d in oot_dirs] # Queue every asset
+        for future in as_completed(futures):                                                # As each one wraps up,
+            this_oot_dir, ok, message = future.result()                                     # get its result
+            results[this_oot_dir] = (ok, message)                                           # stash it for the summary
+            print(f"{'done' if ok else 'FAILED'}: {this_oot_dir.name}")                     # and give a little progress feedback, since big batches take a while
+    # SUMMARY ###############################################################################
+    print()                                                                                 # Breathing room
+    for this_oot_dir in oot_dirs:                                                           # Summary in the order we were given them, not completion order
+        ok, message = results[this_oot_dir]                                                 # How'd it go?
+        print(f"{'OK' if ok else 'FAIL':<6}{this_oot_dir.name:<20}{message}")               # One line per asset
+    failed = sum(1 for ok, _ in results.values() if not ok)                                 # Count up the casualties
+    print(f"\n{len(oot_dirs) - failed} succeeded, {failed} failed.")                        # Bottom line
+    return 1 if failed else 0                                                               # Non-zero exit if anything failed, so scripts can tell
+
+# WATCH MODE ################################################################################ NOTE A long-running service over oots_dir/{year}/{lab}/{UID}/: new or changed inputs get imported by a pool that already has the template loaded
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE, IN_ISDIR = 0x8, 0x80, 0x100, 0x40000000             # The inotify events we care about (linux/inotify.h)
+
+class InotifyWatcher:                                                                       # Linux inotify through libc, no extra dependency. Raises OSError wherever it can't work, and the caller falls back to polling
+    def __init__(self, root):
+        if not sys.platform.startswith("linux"):                                            # Windows/macOS: polling it is
+            raise OSError("inotify is Linux-only")
+        import ctypes.util                                                                  # (pulls in subprocess and friends, so only watch mode pays for it)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}                                                                   # {watch descriptor: folder}
+        self.add_tree(root)
+
+    def add_tree(self, root):                                                               # Watch a folder and everything under it (inotify isn't recursive)
+        for folder, _, _ in os.walk(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:                                                                      # Out of watches (fs.inotify.max_user_watches) or the like
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed on {folder}")
+            self.watches[wd] = Path(folder)
+
+    def changed(self, timeout):                                                             # Wait up to timeout seconds; return the asset folders whose inputs were written or moved in
+        folders = set()
+        if not select.select([self.fd], [], [], timeout)[0]:                                # Nothing happened
+            return folders
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return folders
+        offset = 0
+        while offset < len(data):                                                           # struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].split(b"\0", 1)[0].decode(errors="replace")
+            offset += 16 + length
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_ISDIR:                                                             # New lab/asset folder: watch it too, and look inside (files may beat us there)
+                self.add_tree(folder / name)
+                folders.update(Path(f) for f, _, files in os.walk(folder / name) if rev_trace in files)
+            elif name in (rev_trace, ds_filename):                                          # One of our inputs
+                folders.add(folder)
+        return folders
+
+    def close(self):
+        os.close(self.fd)
+
+def input_fingerprint(this_oot_dir):                                                        # (name, size, mtime) of the folder's inputs; None if there's no rev trace yet, or Excel has it open
+    if (this_oot_dir / f"~${rev_trace}").exists():                                          # Excel's lock file: somebody's still in it
+        return None
+    fingerprint = []
+    for name in (rev_trace, ds_filename):
+        try:
+            stat = (this_oot_dir / name).stat()
+        except OSError:                                                                     # DS.pdf is optional
+            continue
+        fingerprint.append((name, stat.st_size, stat.st_mtime_ns))
+    if not fingerprint or fingerprint[0][0] != rev_trace:                                   # No rev trace, no analysis
+        return None
+    return tuple(fingerprint)
+
+def input_digest(this_oot_dir, fingerprint):                                                # SHA-256 over the inputs' contents, so a touched-but-identical file doesn't trigger a re-import
+    digest = hashlib.sha256()
+    for name, _, _ in fingerprint:
+        digest.update(name.encode())
+        digest.update((this_oot_dir / name).read_bytes())
+    return digest.hexdigest()
+
+def output_current(this_oot_dir, fingerprint):                                              # Is OOT_{UID}.xlsx already newer than every input? Then there's nothing to do
+    try:
+        built = (this_oot_dir / f"OOT_{this_oot_dir.name}.xlsx").stat().st_mtime_ns
+    except OSError:                                                                         # Never built
+        return False
+    return all(mtime <= built for _, _, mtime in fingerprint)
+
+def warm_worker(extractor=ds_extractor):                                                    # Pool initializer: load the template snapshot into this worker's memory once, so every job skips it
+    use_ds_extractor(extractor)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)                                            # Ctrl+C is the service's to handle; workers just finish what they're on
+    load_template(oot_template)
+
+def watch_main(import_ds=True, workers=None, ds_workers=1, compact=False, incremental=False, overlap=True, stream=False, settle=5.0, poll=30.0): # Service entry point: watch this year's OOT folders and import whatever lands, until Ctrl+C
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1                                                # One worker per core by default
+    overlap = overlap and spare_cores(workers)                                              # Same call as batch mode
+    template_snapshot(oot_template)                                                         # Build the template cache up front, before the workers want it
+    watcher, watched_root = None, None                                                      # The inotify watcher, and which year's folder it's on
+    settling = {}                                                                           # {folder: (fingerprint, when it last changed)}; folders wait here until their inputs stop changing
+    imported = {}                                                                           # {folder: (fingerprint, digest) we last imported}
+    running = {}                                                                            # {future: (folder, fingerprint, digest)}
+    next_scan = 0.0                                                                         # When the next full scan is due
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker, initargs=(ds_extractor,)) as pool: # Warm pool: the template (and every import) stays loaded between jobs
+        try:
+            while True:
+                root = oots_dir / datetime.today().strftime("%Y")                           # This year's OOTs (and it rolls over on its own come January)
+                if root != watched_root and root.exists():                                  # New root: (re)start inotify on it
+                    if watcher is not None:
+                        watcher.close()
+                    try:
+                        watcher = InotifyWatcher(root)
+                        print(f"Watching {root} (inotify, full scan every {poll:g}s)")
+                    except OSError as err:                                                  # Windows, network shares, out of watches...
+                        watcher = None
+                        print(f"Watching {root} (polling every {poll:g}s: {err})")
+                    watched_root = root
+                now = time.monotonic()
+                wait = min(settle, max(next_scan - now, 0.0))                               # Never sleep past a settle check or the next scan
+                if now >= next_scan:                                                        # Full scan: catches everything inotify can't see (shares, changes while we were down)
+                    candidates = {path.parent for path in root.glob(f"*/*/{rev_trace}")}
+                    next_scan = now + poll
+                elif watcher is not None:                                                   # Otherwise inotify tells us what changed
+                    try:
+                        candidates = watcher.changed(wait)
+                    except OSError as err:                                                  # A new folder it couldn't watch (out of watches, or gone again already): the scans still see everything
+                        watcher.close()
+                        watcher, candidates, next_scan = None, set(), 0.0                   # (and scan right away, for whatever that event was)
+                        print(f"Watching {root} (polling every {poll:g}s: {err})")
+                else:
+                    time.sleep(wait)
+                    candidates = set()
+                now = time.monotonic()
+                for folder in candidates | set(settling):                                   # Everything new, plus everything still settling
+                    fingerprint = input_fingerprint(folder)
+                    if fingerprint is None:                                                 # Gone, or open in Excel
+                        settling.pop(folder, None)
+                        continue
+                    if folder not in settling or settling[folder][0] != fingerprint:        # Still being written (or just showed up): restart its clock
+                        if imported.get(folder, (None,))[0] != fingerprint:                 # (not if it's exactly what we last imported)
+                            settling[folder] = (fingerprint, now)
+                        continue
+                    if now - settling[folder][1] < settle:                                  # Not quiet long enough yet
+                        continue
+                    if any(busy == folder for busy, _, _ in running.values()):              # Already importing it; we'll look again after
+                        continue
+                    del settling[folder]
+                    try:
+                        digest = input_digest(folder, fingerprint)
+                    except OSError:                                                         # Vanished out from under us
+                        continue
+                    if folder in imported and imported[folder][1] == digest or folder not in imported and output_current(folder, fingerprint): # Same contents as the last output (or, fresh after a restart, the output's newer)
+                        imported[folder] = (fingerprint, digest)
+                        continue
+                    running[pool.submit(batch_worker, folder, import_ds, ds_workers, compact, incremental, overlap, stream)] = (folder, fingerprint, digest) # Queue it up
+                    print(f"{datetime.now():%H:%M:%S} queued: {folder.name}")
+                for future in [f for f in running if f.done()]:                             # Report whatever finished
+                    folder, fingerprint, digest = running.pop(future)
+                    _, ok, message = future.result()
+                    if ok:
+                        imported[folder] = (fingerprint, digest)
+                    print(f"{datetime.now():%H:%M:%S} {'done' if ok else 'FAILED'}: {folder.name} {message}")
+        except KeyboardInterrupt:                                                           # Ctrl+C is the off switch
+            print("Stopping; letting running imports finish.")
+        finally:
+            if watcher is not None:
+                watcher.close()
+    return 0
+
+# ASSET INDEX ############################################################################### NOTE Every import also lands in a local SQLite index, so "which customer assets got hit by more than one standard this quarter?" is a query instead of a day of opening workbooks
+index_db = code_dir / "oot_index.sqlite"                                                    # One row per OOT event (asset folder), one per customer asset it hit, one per failed parameter
+index_version = 2                                                                           # PRAGMA user_version; bump whenever index_schema changes, and teach migrate_index() the step
+index_schema = """
+CREATE TABLE IF NOT EXISTS oots (event TEXT PRIMARY KEY, oot_uid TEXT NOT NULL, lab TEXT, prev_cal TEXT, curr_cal TEXT, assets INTEGER, workbook TEXT, indexed TEXT);
+CREATE TABLE IF NOT EXISTS hits (event TEXT NOT NULL, oot_uid TEXT NOT NULL, dut_uid TEXT NOT NULL, dut_cal TEXT NOT NULL, product TEXT, cal_result TEXT, cert TEXT,
+    PRIMARY KEY (event, dut_uid, dut_cal)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS parameters (event TEXT NOT NULL, parameter TEXT NOT NULL, fails INTEGER, point TEXT, error REAL, margin REAL, units TEXT,
+    PRIMARY KEY (event, parameter)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS duts (dut_uid TEXT PRIMARY KEY, product TEXT, standards INTEGER, oots TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lab_duts (lab TEXT NOT NULL, dut_uid TEXT NOT NULL, product TEXT, standards INTEGER, oots TEXT, PRIMARY KEY (lab, dut_uid)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS oots_uid ON oots (oot_uid, curr_cal);
+CREATE INDEX IF NOT EXISTS oots_lab ON oots (lab, curr_cal);
+CREATE INDEX IF NOT EXISTS oots_window ON oots (curr_cal, prev_cal);
+CREATE INDEX IF NOT EXISTS hits_dut ON hits (dut_uid, oot_uid, product);
+CREATE INDEX IF NOT EXISTS hits_product ON hits (product, dut_uid);
+CREATE INDEX IF NOT EXISTS duts_standards ON duts (standards, dut_uid);
+CREATE INDEX IF NOT EXISTS lab_duts_dut ON lab_duts (dut_uid);
+CREATE TEMP TABLE IF NOT EXISTS affected (dut_uid TEXT PRIMARY KEY) WITHOUT ROWID;
+"""                                                                                         # duts/lab_duts: per customer asset, how many standards hit it (overall/per lab; the same standard in two events counts once); kept current by index_oot(), so the usual questions never scan hits
+summarize_duts = """
+DELETE FROM duts WHERE dut_uid IN (SELECT dut_uid FROM affected);
+INSERT INTO duts SELECT dut_uid, MAX(product), COUNT(DISTINCT oot_uid), GROUP_CONCAT(DISTINCT oot_uid) FROM hits
+    WHERE dut_uid IN (SELECT dut_uid FROM affected) GROUP BY dut_uid;
+DELETE FROM lab_duts WHERE dut_uid IN (SELECT dut_uid FROM affected);
+INSERT INTO lab_duts SELECT COALESCE(lab, ''), dut_uid, MAX(product), COUNT(DISTINCT hits.oot_uid), GROUP_CONCAT(DISTINCT hits.oot_uid) FROM hits JOIN oots USING (event)
+    WHERE dut_uid IN (SELECT dut_uid FROM affected) GROUP BY COALESCE(lab, ''), dut_uid;
+DELETE FROM affected;
+"""                                                                                         # Re-count just the customer assets an upsert touched (old hits and new)
+picked_oots = """picked AS (SELECT event, COALESCE(lab, '') AS lab, prev_cal, curr_cal FROM oots WHERE 1 {lab}
+    AND (:since IS NULL OR curr_cal >= :since) AND (:until IS NULL OR prev_cal <= :until))""" # The OOTs a windowed query covers: cal windows touching since..until (and this lab's, if given)
+index_queries = {
+    "overlaps": (["DUT ID", "Product", "Standards", "OOTs"],
+        """SELECT dut_uid, product, standards, oots FROM {duts} WHERE standards >= :min_standards {lab} {dut} ORDER BY standards DESC, dut_uid""",
+        "WITH " + picked_oots + """
+        SELECT dut_uid, MAX(product), COUNT(DISTINCT oot_uid) AS standards, GROUP_CONCAT(DISTINCT oot_uid) FROM hits
+        WHERE event IN (SELECT event FROM picked) {dut}
+        GROUP BY dut_uid HAVING standards >= :min_standards ORDER BY standards DESC, dut_uid"""),
+    "labs": (["Lab", "OOTs", "Assets Hit", "Hit 2+ Times", "Failed Parameters", "From", "To"],
+        """WITH picked AS (SELECT event, COALESCE(lab, '') AS lab, prev_cal, curr_cal FROM oots WHERE 1 {lab}),
+        per_lab AS (SELECT lab AS lab_name, COUNT(*) AS assets_hit, SUM(standards > 1) AS repeats FROM lab_duts WHERE 1 {lab} GROUP BY lab)
+        SELECT lab, COUNT(*), COALESCE(MAX(assets_hit), 0), COALESCE(MAX(repeats), 0),
+            (SELECT COUNT(*) FROM parameters JOIN picked AS o USING (event) WHERE o.lab = p.lab),
+            MIN(prev_cal), MAX(curr_cal)
+        FROM picked AS p LEFT JOIN per_lab ON lab_name = lab GROUP BY lab ORDER BY lab""",
+        "WITH " + picked_oots + """,
+        lab_hits AS (SELECT lab AS lab_name, dut_uid, COUNT(DISTINCT oot_uid) AS standards FROM hits JOIN picked USING (event) GROUP BY lab, dut_uid)
+        SELECT lab, COUNT(*),
+            (SELECT COUNT(*) FROM lab_hits WHERE lab_name = p.lab),
+            (SELECT COUNT(*) FROM lab_hits WHERE lab_name = p.lab AND standards > 1),
+            (SELECT COUNT(*) FROM parameters JOIN picked AS o USING (event) WHERE o.lab = p.lab),
+            MIN(prev_cal), MAX(curr_cal)
+        FROM picked AS p GROUP BY lab ORDER BY lab"""),
+    "oots": (["OOT UID", "Lab", "Prev Cal", "Curr Cal", "Assets Hit", "Failed Parameters", "Folder"],
+        """SELECT oot_uid, lab, prev_cal, curr_cal, assets, (SELECT COUNT(*) FROM parameters WHERE parameters.event = oots.event), event FROM oots
+        WHERE 1 {lab} {oot} {dut_events} ORDER BY oot_uid, curr_cal, event""",
+        """SELECT oot_uid, lab, prev_cal, curr_cal, assets, (SELECT COUNT(*) FROM parameters WHERE parameters.event = oots.event), event FROM oots
+        WHERE 1 {lab} {oot} {dut_events} AND (:since IS NULL OR curr_cal >= :since) AND (:until IS NULL OR prev_cal <= :until) ORDER BY oot_uid, curr_cal, event"""),
+    }                                                                                       # --query kind: (column headers, SQL off the summaries, SQL off hits for a cal window); {lab}/{dut}/{duts}/{oot}/{dut_events} get filled in by query_index()
+
+def oot_event(this_oot_dir):                                                                # An OOT event's key in the index: its asset folder, relative to the OOTs folder where it can be ({year}/{lab}/{UID}); the same standard going OOT again next year is another event
+    folder = Path(this_oot_dir).resolve()
+    try:
+        return folder.relative_to(oots_dir.resolve()).as_posix()
+    except ValueError:                                                                      # (batch mode takes folders from anywhere)
+        return folder.as_posix()
+
+def migrate_index(db):                                                                      # Bring an older index up to index_version, keeping what's in it
+    columns = {row[1] for row in db.execute("PRAGMA table_info(oots)")}
+    if columns and "event" not in columns:                                                  # Version 1 keyed everything on the standard's UID alone: each OOT becomes the event its workbook's folder says it was
+        db.executescript("""DROP INDEX IF EXISTS oots_lab; DROP INDEX IF EXISTS oots_window; DROP INDEX IF EXISTS hits_dut; DROP INDEX IF EXISTS hits_product;
+            ALTER TABLE oots RENAME TO oots_v1; ALTER TABLE hits RENAME TO hits_v1; ALTER TABLE parameters RENAME TO parameters_v1;""" + index_schema)
+        events = [(oot_event(Path(workbook).parent) if workbook else oot_uid, oot_uid) for oot_uid, workbook in db.execute("SELECT oot_uid, workbook FROM oots_v1")] # (no workbook, no folder: the UID will have to do)
+        with db:
+            db.executemany("INSERT INTO oots SELECT ?, oot_uid, lab, prev_cal, curr_cal, assets, workbook, indexed FROM oots_v1 WHERE oot_uid = ?", events)
+            db.executemany("INSERT INTO hits SELECT ?, oot_uid, dut_uid, dut_cal, product, cal_result, cert FROM hits_v1 WHERE oot_uid = ?", events)
+            db.executemany("INSERT INTO parameters SELECT ?, parameter, fails, point, error, margin, units FROM parameters_v1 WHERE oot_uid = ?", events)
+        db.executescript("DROP TABLE oots_v1; DROP TABLE hits_v1; DROP TABLE parameters_v1;") # (duts/lab_duts count the same either way)
+    db.execute(f"PRAGMA user_version = {index_version}")
+
+def open_index():                                                                           # Connect to the index, creating its tables the first time (and migrating them, if they're from an older version)
+    import sqlite3
+    db = sqlite3.connect(index_db, timeout=30)                                              # Batch workers all write here; an upsert holds the lock for milliseconds, so waiting beats failing
+    if db.execute("PRAGMA user_version").fetchone()[0] < index_version:
+        migrate_index(db)
+    db.executescript(index_schema)
+    return db
+
+def index_date(value):                                                                      # Dates as sortable text: datetimes (what openpyxl hands back) to YYYY-MM-DD, anything else as-is
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return "" if value is None else str(value)
+
+def index_oot(this_oot_dir, asset_UID, final_xlsx=None, rt_columns=None, worst=None):       # Record an import of this asset folder (one OOT event): rt_columns replaces the event's hits, worst ({parameter: worst failure}) its failed parameters; None leaves either as it was. Never fails the import
+    import sqlite3
+    event = oot_event(this_oot_dir)
+    try:
+        db = open_index()
+        try:
+            with db:                                                                        # One transaction: a query sees this OOT all old or all new
+                if db.execute("SELECT 1 FROM oots WHERE event = ?", (asset_UID,)).fetchone(): # A version-1 OOT migrate_index() had no folder for (keyed on the bare UID, which a folder never is): this is its folder, so it moves in
+                    for table in ("oots", "hits", "parameters"):
+                        db.execute(f"UPDATE OR REPLACE {table} SET event = ? WHERE event = ?", (event, asset_UID))
+                db.execute("INSERT INTO oots (event, oot_uid, workbook, indexed) VALUES (?, ?, ?, ?) ON CONFLICT (event) DO UPDATE SET oot_uid = excluded.oot_uid, workbook = excluded.workbook, indexed = excluded.indexed",
+                    (event, asset_UID, str(final_xlsx) if final_xlsx else None, datetime.now().isoformat(timespec="seconds")))
+                if rt_columns is not None:
+                    hits = {}                                                               # {(DUT ID, DUT cal date): (product, cal result, cert #)}
+                    for dut_uid, product, dut_cal, result, cert in zip(*(rt_column(rt_columns, column) for column in "JKLPQ")):
+                        if dut_uid is not None:                                             # (the same asset on the same cal date twice is one hit)
+                            hits[str(dut_uid), index_date(dut_cal)] = (None if product is None else str(product), None if result is None else str(result).strip(), None if cert is None else str(cert))
+                    db.execute("UPDATE oots SET lab = ?, prev_cal = ?, curr_cal = ?, assets = ? WHERE event = ?",
+                        (rt_cell(rt_columns, "F2"), index_date(rt_cell(rt_columns, "G2")), index_date(rt_cell(rt_columns, "H2")), len(hits), event)) # Same as the header block
+                    db.execute("INSERT OR IGNORE INTO affected SELECT dut_uid FROM hits WHERE event = ?", (event,)) # Whoever this OOT hit last time,
+                    db.executemany("INSERT OR IGNORE INTO affected VALUES (?)", ((dut_uid,) for dut_uid, _ in hits)) # and whoever it hits now, needs re-counting
+                    db.execute("DELETE FROM hits WHERE event = ?", (event,))                # A corrected trace can drop assets, so replace rather than merge (other events of the same standard stay put)
+                    db.executemany("INSERT INTO hits VALUES (?, ?, ?, ?, ?, ?, ?)", ((event, asset_UID, *key, *rest) for key, rest in hits.items()))
+                    for statement in summarize_duts.split(";")[:-1]:                        # (executescript() would commit halfway through our transaction)
+                        db.execute(statement)
+                if worst is not None:
+                    db.execute("DELETE FROM parameters WHERE event = ?", (event,))
+                    db.executemany("INSERT INTO parameters VALUES (?, ?, ?, ?, ?, ?, ?)", ((event, param, entry["fails"], None if entry["point"] is None else str(entry["point"]),
+                        entry["error"], entry["margin"], None if entry["units"] is None else str(entry["units"])) for param, entry in worst.items()))
+        finally:
+            db.close()
+    except (OSError, sqlite3.Error) as err:                                                 # Locked for too long, read-only share, etc.: the workbook still counts
+        print(f"Could not update the asset index ({err}).")
+
+def index_folder(this_oot_dir, import_ds, ds_workers=1):                                    # Index an asset folder without building its workbook: for OOTs imported before there was an index
+    rt_columns = read_reverse_trace(this_oot_dir / rev_trace)
+    ds_file = this_oot_dir / ds_filename
+    datasheet = load_datasheet(ds_file, ds_workers) if import_ds and ds_file.exists() else None # (straight from the datasheet cache, for anything imported lately)
+    final_xlsx = this_oot_dir / f"OOT_{this_oot_dir.name}.xlsx"
+    index_oot(this_oot_dir, this_oot_dir.name, final_xlsx if final_xlsx.exists() else None, rt_columns, datasheet["worst"] if datasheet is not None else {})
+
+def index_main(targets, import_ds, ds_workers=1):                                           # --index-only: index every asset folder in targets, one after another (reading is quick; it's building workbooks that isn't)
+    oot_dirs = [d for d in find_oot_dirs(targets) if (d / rev_trace).exists()]
+    if not oot_dirs:
+        print("No OOT directories found.")
+        return 1
+    failed = 0
+    for this_oot_dir in oot_dirs:
+        try:
+            index_folder(this_oot_dir, import_ds, ds_workers)
+            print(f"indexed: {this_oot_dir.name}")
+        except Exception as err:                                                            # Same policy as batch mode: one bad trace doesn't stop the rest
+            failed += 1
+            print(f"FAILED: {this_oot_dir.name} {type(err).__name__}: {err}")
+    print(f"\n{len(oot_dirs) - failed} indexed, {failed} failed.")
+    return 1 if failed else 0
+
+def query_index(kind, lab=None, since=None, until=None, dut=None, min_standards=2, oot=None): # Run one of index_queries, off the summaries unless it's for a cal window. Returns (headers, rows)
+    headers, summary_sql, window_sql = index_queries[kind]
+    db = open_index()
+    try:
+        sql = (window_sql if since or until else summary_sql).format(                       # Filters go in only when they're given: "x IS NULL OR" would keep SQLite off the indexes
+            lab="" if lab is None else "AND lab = :lab", dut="" if dut is None else "AND dut_uid = :dut", duts="duts" if lab is None else "lab_duts",
+            oot="" if oot is None else "AND oot_uid = :oot", dut_events="" if dut is None else "AND event IN (SELECT event FROM hits WHERE dut_uid = :dut)")
+        rows = db.execute(sql, {"lab": lab, "since": since, "until": until, "dut": dut, "min_standards": min_standards, "oot": oot}).fetchall()
+    finally:
+        db.close()
+    return headers, rows
+
+def query_main(kind, lab=None, since=None, until=None, dut=None, min_standards=2, oot=None): # --query: print the answer as a table
+    headers, rows = query_index(kind, lab, since, until, dut, min_standards, oot)
+    table = [headers] + [["" if value is None else str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(headers))]
+    for row in table:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    print(f"\n{len(rows)} row{'s' if len(rows) != 1 else ''}.")
+    return 0
+
+def iso_date(text):                                                                         # argparse type for --since/--until: YYYY-MM-DD, checked
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}") from None
+
+# PREVIEW ################################################################################### NOTE --dry-run: what an import would build (products sampled, failed parameters, sheets) off the trace and datasheet alone. The template never gets loaded, which is most of an import's time
+def preview_oot(this_oot_dir, import_ds, ds_workers=1):                                     # The read, sample and failure-mapping stages for one asset folder, summarized as a dict ready for JSON
+    trace = read_trace(this_oot_dir / rev_trace)                                            # (read-only, streamed rows)
+    sample = sample_trace(trace)
+    ds_file = this_oot_dir / ds_filename
+    datasheet = extract_datasheet(ds_file, ds_workers) if import_ds and ds_file.exists() else None # (straight from the datasheet cache, if it's been parsed before)
+    parameters = map_failures(datasheet)
+    preview = {"folder": str(this_oot_dir), "oot_uid": trace.oot_uid, "owning_lab": trace.owning_lab,
+        "prev_cal": index_date(trace.prev_cal), "curr_cal": index_date(trace.curr_cal),
+        "assets": trace.assets,
+        "products_sampled": sum(1 for count in sample.represents if count),                 # One visible row per product
+        "no_dut_id": sum(1 for count in sample.represents if count is None),
+        "analysis_rows": sample.end_row - start_row + 1,
+        "datasheet": None,
+        "parameter_sheets": len(parameters)}                                                # (none means the Impact Analysis tab is the analysis)
+    if datasheet is not None:
+        starts = [start for _, start, _ in datasheet.parameters]
+        preview["datasheet"] = {"rows": len(datasheet.rows), "parameters": len(datasheet.parameters), "failure_rows": datasheet.failures, # Rows as numbered on the Datasheet tab
+            "failed_parameters": [{"name": param,
+                "failure_rows": [row for row in datasheet.failures if parameter_at(datasheet.parameters, starts, row) == param],
+                **{key: datasheet.worst[param][key] for key in ("fails", "point", "error", "margin", "units")}} for param in parameters]}
+    return preview
+
+def preview_main(targets, import_ds, ds_workers=1):                                         # --dry-run with folders: every asset's preview, one after another, as one JSON list
+    oot_dirs = [d for d in find_oot_dirs(targets) if (d / rev_trace).exists()]
+    if not oot_dirs:
+        print("No OOT directories found.")
+        return 1
+    previews, failed = [], 0
+    for this_oot_dir in oot_dirs:
+        try:
+            previews.append(preview_oot(this_oot_dir, import_ds, ds_workers))
+        except Exception as err:                                                            # Same policy as batch mode: one bad trace doesn't stop the rest
+            failed += 1
+            previews.append({"folder": str(this_oot_dir), "error": f"{type(err).__name__}: {err}"})
+    print(json.dumps(previews, indent=2, default=str))                                      # (cell values can be anything FSM typed in)
+    return 1 if failed else 0
+
+# ENTRY POINTS ############################################################################## NOTE Importing this module is cheap (stdlib only), so a GUI can import it and call these plus import_oot() (or its stages, see PIPELINE STAGES), same as main() does
+def warm_up(import_ds=False):                                                               # Load what an import is going to need - openpyxl and the template snapshot (and pdfplumber, if there's a datasheet) - ahead of time, e.g. on a thread while somebody's still answering prompts
+    template_snapshot(oot_template)
+    if import_ds:
+        importlib.import_module("pdfplumber")
+
+def oot_dir_for(lab, asset_UID, year=None, create=True):                                    # An asset's folder, oots_dir/{year}/{lab}/{UID}/ (this year's by default), created if need be (create=False: just the path). The prompts and the GUI both end up here
+    this_oot_dir = oots_dir / f"{year or datetime.today().strftime('%Y')}/{lab}/{asset_UID}/"
+    if create:
+        this_oot_dir.mkdir(parents=True, exist_ok=True)                                     # Ensure output dir exists
+    return this_oot_dir
+
+# MAIN LOOP #################################################################################
+def main():                                                                                 # The main loop of the application
+    # ARGUMENTS #############################################################################
+    parser = argparse.ArgumentParser(description="Import FSM Reverse Traces (and Tek datasheets) into the OOT impact analysis template.")
+    parser.add_argument("targets", nargs="*", help="OOT asset folders or globs to process headless, e.g. '2025/Baltimore/*'. Leave empty for the interactive mode.")
+    ds_group = parser.add_mutually_exclusive_group()                                        # Batch mode can't ask "Import datasheet?", so it's a flag instead
+    ds_group.add_argument("--datasheet", dest="import_ds", action="store_true", default=True, help="Import DS.pdf where it exists (default in batch mode)")
+    ds_group.add_argument("--no-datasheet", dest="import_ds", action="store_false", help="Skip the datasheet import in batch mode")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel workers in batch mode (default: one per CPU core)")
+    parser.add_argument("--ds-workers", type=int, default=None, help="Processes for datasheet PDF extraction; 1 means serial (default: one per CPU core interactively, 1 in batch mode, where the assets are already parallel)")
+    parser.add_argument("--ds-extractor", choices=list(ds_extractors), default=ds_extractor, help="Datasheet table backend: 'table' is pdfplumber's table finder (the reference), 'words' reads the ruled grid directly and is faster; run dscompare.py on your datasheets before switching")
+    parser.add_argument("--compact", action="store_true", help="Write each per-row formula once per column (shared formulas), for smaller files that open faster")
+    parser.add_argument("--incremental", action="store_true", help="Patch an existing OOT_<UID>.xlsx to match changed inputs, keeping the techs' entries (columns M-P, R-T, Y-Z, AI, AJ), instead of rebuilding it from the template")
+    parser.add_argument("--sequential", dest="overlap", action="store_false", help="Load the template, Reverse Trace and datasheet one after another, and deflate the parameter sheets one at a time, instead of concurrently (default: concurrently, wherever there are cores to spare)")
+    parser.add_argument("--stream", action="store_true", help="Constant-memory mode for very large Reverse Traces: stream the trace in and the workbook out row by row, instead of holding every cell in memory (not with --compact or --incremental)")
+    parser.add_argument("--dry-run", action="store_true", help="Preview instead of importing: print the asset count, products sampled, failed datasheet parameters (and their rows) and parameter sheets as JSON, without loading the template or writing anything")
+    parser.add_argument("--index-only", action="store_true", help="With folders: add their Reverse Traces (and datasheets) to the asset index without building workbooks, e.g. to backfill OOTs imported before there was an index")
+    parser.add_argument("--query", choices=list(index_queries), default=None, help="Query the asset index instead of importing: 'overlaps' lists customer assets hit by several OOT standards, 'labs' rolls the OOTs up per lab, 'oots' lists every OOT event (a standard going OOT again is another event) with its cal window")
+    parser.add_argument("--lab", default=None, help="Query: only this lab's OOTs")
+    parser.add_argument("--since", type=iso_date, default=None, help="Query: only OOTs whose cal window ends on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=iso_date, default=None, help="Query: only OOTs whose cal window starts on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--dut", default=None, help="Query: only this customer asset (DUT ID)")
+    parser.add_argument("--oot", default=None, help="Query 'oots': only this standard's OOT events (OOT UID)")
+    parser.add_argument("--min-standards", type=int, default=2, help="Query 'overlaps': hit by at least this many OOT standards (default: 2; 1 lists every hit)")
+    parser.add_argument("--profile", action="store_true", help="Time every stage (wall, CPU, peak RSS, rows/pages); prints a table and writes OOT_<UID>.profile.json next to the workbook")
+    parser.add_argument("--profile-stage", action="append", choices=pipeline_stages, default=[], help="Also dump cProfile stats for this stage to OOT_<UID>.<stage>.prof (repeatable; implies --profile)")
+    parser.add_argument("--watch", action="store_true", help="Service mode: watch this year's OOT folders and import new or changed Reverse Traces/datasheets as they land")
+    parser.add_argument("--settle", type=float, default=5.0, help="Watch mode: seconds an asset's inputs must sit unchanged before importing (default: 5)")
+    parser.add_argument("--poll", type=float, default=30.0, help="Watch mode: seconds between full folder scans (default: 30)")
+    args = parser.parse_args()                                                              # Read the command line
+    profile_stages = args.profile_stage if args.profile or args.profile_stage else None     # None means no profiling at all
+    use_ds_extractor(args.ds_extractor)
+    if args.stream and (args.compact or args.incremental):                                  # Both need the whole sheet in memory
+        parser.error("--stream can't be combined with --compact or --incremental")
+    if args.query:                                                                          # Straight to the index; no template needed
+        raise SystemExit(query_main(args.query, args.lab, args.since, args.until, args.dut, args.min_standards, args.oot))
+    if args.dry_run and args.watch:
+        parser.error("--dry-run can't be combined with --watch")
+    if args.dry_run and args.targets:                                                       # Previews don't need the template either
+        raise SystemExit(preview_main(args.targets, args.import_ds, args.ds_workers or 1))
+    if args.index_only:
+        if not args.targets:
+            parser.error("--index-only needs asset folders to index")
+        raise SystemExit(index_main(args.targets, args.import_ds, args.ds_workers or 1))
+    if not args.dry_run and not oot_template.exists():                                      # Let's check for the template file, see if the package was tampered with
+        file = oot_template.name                                                            # Well, it's gone. So, let's get the name out of the file path,
+        print(f"{file} does not exist.")                                                    # so we can announce what's happened
+        raise SystemExit(1)                                                                 # ...and gtfo
+    if args.watch:                                                                          # Service mode: runs until Ctrl+C
+        raise SystemExit(watch_main(args.import_ds, args.workers, args.ds_workers or 1, args.compact, args.incremental, args.overlap, args.stream, args.settle, args.poll))
+    if args.targets:                                                                        # Folders on the command line means batch mode
+        raise SystemExit(batch_main(args.targets, args.import_ds, args.workers, args.ds_workers or 1, args.compact, args.incremental, args.overlap, args.stream, profile_stages)) # Run them all, and exit with its status
+    # INIT ##################################################################################
+    warming = threading.Thread(target=warm_up, daemon=True)                                 # openpyxl and the template load while the tech answers the prompts, instead of before them
+    if not args.dry_run:                                                                    # (a preview never loads the template, so don't bother)
+        warming.start()
+    current_dir = Path.cwd()                                                                # where script was run from
+    this_oot_dir = current_dir                                                              # where script was run from
+    # ERROR CHECKING ########################################################################
+    rev_trace_file = this_oot_dir / rev_trace                                               # Establish the file we need
+    if not rev_trace_file.exists():                                                         # This is a good proxy to see what kind of directory we're running the script in - if there isn't a rev trace in cwd, we're probably running it from $HOME, so we need to build the correct location and 'navigate' to it
+        lab = input("Enter lab location: ")                                                 # Baltimore, Strother, etc
+        asset_UID = input("Enter UID: ")                                                    # The asset itself
+        this_oot_dir = oot_dir_for(lab, asset_UID, create=not args.dry_run)                 # Establish the output directory (a preview writes nothing, folders included)
+    else:                                                                                   # Then we have a rev trace file, and we need to set this one variable that's required later
+        asset_UID = this_oot_dir.name                                                       # Because I'm not bloody asking the techs to type UIDs if I can avoid it
+    ds_import = input("Import datasheet? ").strip().lower()                                 # Final bit of INIT input for later. TODO: set this up in the GUI, when that time comes
+    if args.dry_run:                                                                        # Just the preview, for this one asset
+        if not (this_oot_dir / rev_trace).exists():                                         # (same as --dry-run with folders)
+            print("No OOT directories found.")
+            raise SystemExit(1)
+        print(json.dumps(preview_oot(this_oot_dir, ds_import in ["y", "yes"], args.ds_workers or os.cpu_count() or 1), indent=2, default=str))
+        return
+    warming.join()                                                                          # (usually long done by now)
+    if profile_stages is not None:                                                          # --profile: same import, with the stopwatch running
+        profiled_import(this_oot_dir, asset_UID, ds_import in ["y", "yes"], args.ds_workers or os.cpu_count() or 1, args.compact, args.incremental, args.overlap, args.stream, profile_stages)
+    else:
+        import_oot(this_oot_dir, asset_UID, ds_import in ["y", "yes"], args.ds_workers or os.cpu_count() or 1, args.compact, args.incremental, args.overlap, args.stream) # And away we go
 
 # MAIN LOOP INITIATION ######################################################################
 if __name__ == "__main__":                                                                  # If we called this directly, and NOT if we loaded this as a library